@@ -0,0 +1,156 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from search import file_fingerprint, page_text, tokenize
+
+
+def normalize_question(question):
+    # Same normalization as retrieval, so "What are the Fibre packages?"
+    # and "fibre package" share an entry
+    return " ".join(tokenize(question))
+
+
+def context_fingerprint(pages):
+    digest = hashlib.sha1()
+    for _, url, data in pages:
+        digest.update(url.encode("utf8"))
+        digest.update(b"\0")
+        digest.update(page_text(data).encode("utf8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def cache_key(question, pages, history=()):
+    key = f"{normalize_question(question)}|{context_fingerprint(pages)}"
+    if history:
+        # Earlier turns go into the prompt, so they must be part of the key
+        key += "|" + hashlib.sha1(json.dumps(history).encode("utf8")).hexdigest()
+    return key
+
+
+class AnswerCache:
+    """LRU + TTL cache of LLM answers, optionally persisted to SQLite.
+
+    The whole cache is dropped whenever the source index file changes, so a
+    fresh scraper.py run never serves answers built from old pages.
+    """
+
+    def __init__(self, max_entries=500, ttl=24 * 3600, db_path=None,
+                 source_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.source_path = source_path
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (answer, created, gen_seconds)
+        self.hits = self.misses = 0
+        self.saved_seconds = 0.0
+
+        self._db = None
+        self._version = self._source_version()
+        if db_path:
+            # Every gunicorn worker opens the same file; WAL plus a busy
+            # timeout keeps their writes from failing with "database is locked"
+            self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, "
+                "answer TEXT, created REAL, gen_seconds REAL)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            self._load()
+
+    def _source_version(self):
+        if not self.source_path:
+            return None
+        try:
+            return file_fingerprint(self.source_path)
+        except OSError:
+            return None
+
+    def _load(self):
+        row = self._db.execute(
+            "SELECT value FROM meta WHERE name = 'source_version'").fetchone()
+        if not row or row[0] != self._version:
+            self._clear_db()
+            return
+        rows = self._db.execute(
+            "SELECT key, answer, created, gen_seconds FROM answers "
+            "WHERE created > ? ORDER BY created DESC LIMIT ?",
+            (time.time() - self.ttl, self.max_entries)).fetchall()
+        for key, answer, created, gen_seconds in reversed(rows):
+            self._entries[key] = (answer, created, gen_seconds)
+
+    def _write(self, *statements):
+        # A failed write only costs persistence: the in-memory entries still
+        # serve this worker, so log it rather than fail the chat request
+        try:
+            with self._db:
+                for sql, params in statements:
+                    self._db.execute(sql, params)
+        except sqlite3.Error as e:
+            print(f"⚠️ Answer cache write failed: {e}")
+
+    def _clear_db(self):
+        self._write(
+            ("DELETE FROM answers", ()),
+            ("INSERT OR REPLACE INTO meta VALUES ('source_version', ?)", (self._version,)))
+
+    def _check_source(self):
+        version = self._source_version()
+        if version != self._version:
+            self._version = version
+            self._entries.clear()
+            if self._db:
+                self._clear_db()
+
+    def _delete(self, key):
+        self._entries.pop(key, None)
+        if self._db:
+            self._write(("DELETE FROM answers WHERE key = ?", (key,)))
+
+    def get(self, key):
+        with self._lock:
+            self._check_source()
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[1] > self.ttl:
+                self._delete(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry[2]
+            return entry[0]
+
+    def put(self, key, answer, gen_seconds=0.0):
+        with self._lock:
+            self._check_source()
+            entry = (answer, time.time(), gen_seconds)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if self._db:
+                self._write(("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)", (key, *entry)))
+            while len(self._entries) > self.max_entries:
+                self._delete(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db:
+                self._clear_db()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "saved_generation_seconds": round(self.saved_seconds, 2),
+            }
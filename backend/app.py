@@ -1,52 +1,256 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import json
 import os
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
-from llm_ollama import query_ollama
+from llm_ollama import client as ollama_client, query_ollama, stream_ollama
+from search import load_or_build
+from answer_cache import AnswerCache, cache_key
+from corpus import Corpus
+from chunking import estimate_tokens, page_passages, passage_docs, passage_pages
+from context_builder import PromptStats, build_context, fit_history
+from geo import BranchLocator, Gazetteer, nominatim_geocode
+from intents import IntentRouter
+import tracing
+from tracing import span
+from sessions import (SESSION_COOKIE, SESSION_HEADER, SESSION_TTL, add_turn,
+                      create_store, session_id_from_request)
 import re
+import threading
+import time
 
 
 app = Flask(__name__)
-user_sessions = {}
-CORS(app)
+CORS(app, expose_headers=[SESSION_HEADER, "Server-Timing"])
+
+# Send this header (any value) to get per-stage timings back in a
+# Server-Timing response header, or in the done event of /chat/stream
+DEBUG_TIMING_HEADER = "X-Debug-Timing"
+
+# "memory" keeps sessions per worker; "sqlite" shares them across workers
+SESSION_STORE = create_store(os.environ.get("SLT_SESSION_BACKEND", "memory"))
 
 # Load Data
+# Prefer the memory-mapped corpus written by scraper.py / corpus.py; fall back
+# to index.json when the corpus is missing or older than it.
+CORPUS_PATH, JSON_INDEX_PATH = "data/corpus.bin", "data/index.json"
+PASSAGE_INDEX_PATH = "data/passage_index.json"
+DELTA_PATH = "data/index_delta.json"
+DELTA_DIR = "data/deltas"   # scraper.py keeps recent deltas here by "created"
+INDEX_PATH = CORPUS_PATH
+if not os.path.exists(CORPUS_PATH) or (
+        os.path.exists(JSON_INDEX_PATH) and
+        os.path.getmtime(JSON_INDEX_PATH) > os.path.getmtime(CORPUS_PATH)):
+    INDEX_PATH = JSON_INDEX_PATH
+
+
+def load_pages():
+    if INDEX_PATH == CORPUS_PATH:
+        return Corpus(CORPUS_PATH)
+    print("💡 Run `python corpus.py` to build the compact corpus.")
+    with open(JSON_INDEX_PATH, encoding="utf8") as f:
+        return json.load(f)
+
+
+def read_delta_created():
+    # scraper.py writes the delta after index.json and corpus.bin, so the
+    # files loaded at startup contain at least this delta. If a crawl lands
+    # in between, its delta is applied again in place, which is harmless.
+    try:
+        with open(DELTA_PATH, encoding="utf8") as f:
+            return json.load(f).get("created")
+    except (OSError, ValueError):
+        return None
+
+
 try:
     with open("data/branches.json", encoding="utf8") as f:
         BRANCHES = json.load(f)
-    with open("data/index.json", encoding="utf8") as f:
-        INDEX = json.load(f)
+    INDEX = load_pages()
     print(f"✅ Loaded {len(INDEX)} scraped pages and {len(BRANCHES)} branches.")
 except Exception as e:
     print(f"❌ Error loading data: {e}")
     BRANCHES, INDEX = [], {}
 
+try:
+    GAZETTEER = Gazetteer.load("data/gazetteer.json", "data/branches.json")
+except Exception as e:
+    print(f"❌ Error loading gazetteer: {e}")
+    GAZETTEER = Gazetteer(BRANCHES)
+BRANCH_LOCATOR = BranchLocator(BRANCHES)
+ROUTER = IntentRouter.load("data/intents.json", BRANCHES)
+NOMINATIM_FALLBACK = True  # geocode online when the gazetteer has no match
+
+# Tokens of conversation history + retrieved context per prompt
+PROMPT_TOKEN_BUDGET = int(os.environ.get("SLT_PROMPT_TOKENS", "700"))
+HISTORY_SHARE = 0.4         # most of the budget earlier turns may take
+PASSAGE_CANDIDATES = 12     # passages retrieved before dedupe / budgeting
+
+
+def load_passage_index(pages):
+    return load_or_build(lambda: passage_pages(pages), INDEX_PATH, PASSAGE_INDEX_PATH)
+
+
+PASSAGE_INDEX = load_passage_index(INDEX)
+PROMPT_STATS = PromptStats()
+INDEX_LOCK = threading.Lock()
+
+# Each gunicorn worker holds its own INDEX, so every worker picks up new
+# scraper.py deltas itself instead of relying on /index/delta reaching it
+DELTA_CHECK_INTERVAL = 5    # seconds between checks of DELTA_PATH
+DELTA_LOCK = threading.Lock()
+INDEX_VERSION = read_delta_created()    # "created" of the last delta applied
+_delta_mtime, _next_delta_check = None, 0.0
+ANSWER_CACHE = AnswerCache(
+    db_path="data/answer_cache.sqlite3", source_path=INDEX_PATH)
+
+REPLIES = tracing.REGISTRY.counter(
+    "slt_replies_total", "Chat replies by how they were produced.", ["kind"])
+PROMPT_TOKENS = tracing.REGISTRY.histogram(
+    "slt_prompt_tokens", "Estimated tokens per prompt sent to the LLM.",
+    buckets=tracing.TOKEN_BUCKETS)
+
 # -------------------------------
 # 🔍 Search & Scoring Logic
 # -------------------------------
 
 
-def score_relevance(query, data):
-    query_words = query.lower().split()
-    text = data.get("text", "").lower()
-    if "ocr_images" in data:
-        text += " " + " ".join(img["text"].lower()
-                               for img in data["ocr_images"])
-    return sum(text.count(word) for word in query_words)
-
-
-def find_relevant_pages(query, top_n=3):
-    scored = [(score_relevance(query, data), url, data)
-              for url, data in INDEX.items()]
-    return sorted([s for s in scored if s[0] > 0], reverse=True)[:top_n]
+def find_relevant_passages(query, top_n=PASSAGE_CANDIDATES):
+    """Return [(score, url, passage text), ...], best first."""
+    sync_index_delta()
+    with INDEX_LOCK:
+        results, pages = [], {}
+        for score, doc in PASSAGE_INDEX.search(query, top_n):
+            url, i = doc.rsplit("#", 1)
+            # Corpus decodes a page on every lookup, so decode each hit page once
+            if url not in pages:
+                pages[url] = page_passages(INDEX[url])
+            results.append((score, url, pages[url][int(i)]))
+        return results
+
+
+def _unindex_page(url, data):
+    for doc, passage in passage_docs(url, data).items():
+        PASSAGE_INDEX.remove_page(doc, passage)
+
+
+def apply_index_delta(delta):
+    """Apply a scraper.py delta to INDEX and the search indexes in place."""
+    updates = {**delta.get("added", {}), **delta.get("changed", {})}
+    with INDEX_LOCK:
+        for url in delta.get("removed", []):
+            old = INDEX.pop(url, None)
+            if old is not None:
+                _unindex_page(url, old)
+        for url, page in updates.items():
+            old = INDEX.get(url)
+            if old is not None:
+                _unindex_page(url, old)
+            for doc, passage in passage_docs(url, page).items():
+                PASSAGE_INDEX.add_page(doc, passage)
+            INDEX[url] = page
+    return {
+        "added": len(delta.get("added", {})),
+        "changed": len(delta.get("changed", {})),
+        "removed": len(delta.get("removed", [])),
+    }
+
+
+def reload_index():
+    """Reload pages and passages from disk, as a restarted worker would."""
+    global INDEX, PASSAGE_INDEX
+    pages = load_pages()
+    passages = load_passage_index(pages)
+    with INDEX_LOCK:
+        INDEX, PASSAGE_INDEX = pages, passages
+
+
+def delta_chain(latest):
+    """Deltas from INDEX_VERSION up to `latest`, oldest first, or None.
+
+    Follows each delta's "base" back through DELTA_DIR; None means some
+    delta in between was pruned or never archived.
+    """
+    chain = [latest]
+    while chain[-1].get("base") != INDEX_VERSION:
+        base = chain[-1].get("base")
+        path = os.path.join(DELTA_DIR, f"index_delta.{base!r}.json")
+        if base is None or not os.path.exists(path):
+            return None
+        with open(path, encoding="utf8") as f:
+            chain.append(json.load(f))
+    return chain[::-1]
+
+
+def sync_index_delta(force=False):
+    """Apply DELTA_PATH if scraper.py wrote a new one since the last check.
+
+    A delta whose "base" is the version this worker holds is applied in
+    place. A worker that missed deltas, e.g. because it served no search
+    in between, replays the archived ones in order; only when one of them
+    is gone does it reload everything from disk. Returns the summed
+    apply_index_delta counts, {"reloaded": True}, or None when there was
+    nothing new.
+    """
+    global INDEX_VERSION, _delta_mtime, _next_delta_check
+    now = time.monotonic()
+    if not force and now < _next_delta_check:
+        return None
+    with DELTA_LOCK:
+        _next_delta_check = now + DELTA_CHECK_INTERVAL
+        try:
+            mtime = os.path.getmtime(DELTA_PATH)
+        except OSError:
+            return None
+        if mtime == _delta_mtime:
+            return None
+        with open(DELTA_PATH, encoding="utf8") as f:
+            delta = json.load(f)
+        _delta_mtime = mtime
+        if delta.get("created") == INDEX_VERSION:
+            return None
+        chain = delta_chain(delta)
+        if chain is not None:
+            result = {"added": 0, "changed": 0, "removed": 0}
+            for step in chain:
+                for kind, count in apply_index_delta(step).items():
+                    result[kind] += count
+        else:
+            reload_index()
+            result = {"reloaded": True}
+        INDEX_VERSION = delta.get("created")
+        print(f"🔄 Index updated from {DELTA_PATH}: {result}")
+        return result
+
+
+URL_PATTERN = re.compile(r'(https?://[^\s)]+)')
+TRAILING_WORD = re.compile(r'\S*$')
 
 
 def convert_links_to_html(text):
     # Turn any plain URL into clickable link
-    url_pattern = re.compile(r'(https?://[^\s)]+)')
-    return url_pattern.sub(r'<a href="\1" target="_blank" rel="noopener noreferrer" class="text-blue-600 underline">\1</a>', text)
+    return URL_PATTERN.sub(r'<a href="\1" target="_blank" rel="noopener noreferrer" class="text-blue-600 underline">\1</a>', text)
+
+
+def convert_links_stream(chunks):
+    # URLs never contain whitespace, so hold back the trailing word of each
+    # chunk until more text arrives; a URL split across chunks stays whole.
+    # Only the conversion itself is timed, not the wait for upstream chunks.
+    pending, spent = "", 0.0
+    for chunk in chunks:
+        pending += chunk
+        start = time.perf_counter()
+        cut = TRAILING_WORD.search(pending).start()
+        html = convert_links_to_html(pending[:cut]) if cut else None
+        spent += time.perf_counter() - start
+        if html is not None:
+            yield html
+            pending = pending[cut:]
+    if pending:
+        start = time.perf_counter()
+        html = convert_links_to_html(pending)
+        spent += time.perf_counter() - start
+        yield html
+    tracing.record("link_conversion", spent)
 
 
 # -------------------------------
@@ -54,13 +258,18 @@ def convert_links_to_html(text):
 # -------------------------------
 
 
-def find_nearest_branches(user_coords, branches, top_n=3):
-    distances = []
-    for branch in branches:
-        dist = geodesic(
-            user_coords, (branch["latitude"], branch["longitude"])).km
-        distances.append((branch, dist))
-    return sorted(distances, key=lambda x: x[1])[:top_n]
+def find_nearest_branches(user_coords, top_n=3):
+    return BRANCH_LOCATOR.nearest(user_coords, top_n)
+
+
+def resolve_location(user_input):
+    # Offline gazetteer first; Nominatim only for places it doesn't know
+    place = GAZETTEER.resolve(user_input)
+    if place:
+        return place["latitude"], place["longitude"], f"{place['name']}, Sri Lanka"
+    if NOMINATIM_FALLBACK:
+        return nominatim_geocode(user_input.strip().lower())
+    return None
 
 
 def format_branch(branch, dist_km):
@@ -76,20 +285,20 @@ def format_branch(branch, dist_km):
 
 def location_response(user_input):
     try:
-        geolocator = Nominatim(user_agent="slt-location-finder")
-
         if "near me" in user_input.lower() or user_input.strip().lower() in ["me", "here", "my location"]:
             return "📍 Please tell me your city to find nearby SLT branches. For example: 'Find branches near Kandy'"
 
-        location = geolocator.geocode(f"{user_input}, Sri Lanka")
+        with span("geocode"):
+            location = resolve_location(user_input)
         if not location:
             return "❌ Sorry, I couldn't find that location. Please try with a nearby city or town."
 
-        user_coords = (location.latitude, location.longitude)
-        nearest = find_nearest_branches(user_coords, BRANCHES)
+        lat, lon, address = location
+        with span("nearest_branches"):
+            nearest = find_nearest_branches((lat, lon))
 
         response = [
-            f"📌 Your location: **{location.address}**",
+            f"📌 Your location: **{address}**",
             "\n🏢 **Here are the nearest SLT branches:**\n"
         ]
         for branch, dist in nearest:
@@ -107,80 +316,89 @@ def location_response(user_input):
 # -------------------------------
 
 
-@app.route("/chat", methods=["POST"])
-def chat():
-    try:
-        data = request.get_json()
-        user_input = data.get("message", "").strip().lower()
-        user_id = "default"  # placeholder, use real user ID or session in future
+FIELD_LABELS = {
+    "phone": "📞 Phone",
+    "email": "📧 Email",
+    "address": "🏠 Address",
+}
 
-        if not user_input:
-            return jsonify({"error": "❌ Empty message provided."}), 400
 
-        # 1. Casual chat (hi, thanks, etc.)
-        casual_replies = {
-            "hello": "👋 Hello! How can I help you today?",
-            "hi": "Hi there! 😊 Ask me anything about SLT services.",
-            "thanks": "🙏 You're welcome!",
-            "thank you": "Happy to help! 😊",
-            "bye": "👋 Goodbye! Have a great day.",
-        }
-        if user_input in casual_replies:
-            return jsonify({"reply": casual_replies[user_input]})
-
-        # 2. If waiting for city name
-        if user_sessions.get(user_id) == "awaiting_city":
-            user_sessions[user_id] = None
-            response = location_response(user_input)
-            return jsonify({"reply": response})
-
-        # 3. Ask for city if vague query like "near me"
-        if "near me" in user_input or user_input in ["me", "my location", "near"]:
-            user_sessions[user_id] = "awaiting_city"
-            return jsonify({"reply": "📍 Sure! Please tell me your city name (e.g., Colombo, Kandy, or Galle)."})
-
-        # 4. Exact city name based lookup
-        for branch in BRANCHES:
-            name_lower = branch["name"].lower()
-            if name_lower in user_input:
-                lines = [f"📍 SLT Branch: **{branch['name']}**"]
-                if "contact" in user_input or "phone" in user_input:
-                    lines.append(
-                        f"📞 Phone: {branch.get('phone', 'Not available')}")
-                if "email" in user_input:
-                    lines.append(
-                        f"📧 Email: {branch.get('email', 'Not available')}")
-                if "address" in user_input or "location" in user_input:
-                    lines.append(
-                        f"🏠 Address: {branch.get('address', 'Not available')}")
-                if len(lines) > 1:
-                    return jsonify({"reply": "\n".join(lines)})
-
-        # 5. Generic branch/location query
-        location_keywords = ["branch", "location",
-                             "coverage", "area", "office"]
-        if any(k in user_input for k in location_keywords):
-            return jsonify({"reply": location_response(user_input)})
-
-        # 6. General Q&A via LLaMA
-        pages = find_relevant_pages(user_input)
-        if not pages:
-            return jsonify({"reply": "❌ I couldn't find relevant information. Try rephrasing your question."})
-
-        context_blocks = []
-        for _, url, data in pages:
-            summary = data.get("text", "")
-            ocr_list = data.get("ocr_images", [])
-            ocr_summary = "\n".join(
-                [f"- {img['src'].split('/')[-1]}: {img['text']}" for img in ocr_list[:3]])
-            block = f"🔗 Page: {url}\n📄 Text: {summary[:1000]}\n🖼️ OCR: {ocr_summary[:500]}"
-            context_blocks.append(block)
-
-        full_context = "\n\n---\n\n".join(context_blocks)
-
-        prompt = f"""
-You are an expert assistant for Sri Lanka Telecom (SLT), helping users with their questions based on official content from www.slt.lk.
+def branch_info_reply(user_input, entities):
+    branch = entities["branch"]
+    lines = [f"📍 SLT Branch: **{branch['name']}**"]
+    for field in entities["fields"]:
+        lines.append(
+            f"{FIELD_LABELS[field]}: {branch.get(field, 'Not available')}")
+    return "\n".join(lines)
+
 
+# Intents in data/intents.json with a "handler" are answered by these
+INTENT_HANDLERS = {
+    "branch_info": branch_info_reply,
+    "location": lambda user_input, entities: location_response(user_input),
+}
+
+
+def prepare_reply(user_input, session):
+    """Run the rule cascade for a message, updating session["state"].
+
+    Returns (reply, None, None) for canned and branch/location replies,
+    (reply, None, cache_key) for a cached LLM answer, or
+    (None, prompt, cache_key) when the question has to go to the LLM.
+    """
+    with span("intent_routing"):
+        intent, entities = ROUTER.route(user_input)
+
+    # 1. Casual chat (hi, thanks, etc.)
+    if intent.get("reply") and intent.get("keeps_state"):
+        REPLIES.inc("casual")
+        return intent["reply"], None, None
+
+    # 2. If waiting for city name
+    if session["state"] == "awaiting_city":
+        session["state"] = None
+        REPLIES.inc("location")
+        return location_response(user_input), None, None
+
+    # 3. Canned replies, e.g. ask for city if vague query like "near me"
+    if intent.get("reply"):
+        if "state" in intent:
+            session["state"] = intent["state"]
+        REPLIES.inc("canned")
+        return intent["reply"], None, None
+
+    # 4. Branch details and generic branch/location queries
+    if intent.get("handler"):
+        REPLIES.inc(intent["handler"])
+        return INTENT_HANDLERS[intent["handler"]](user_input, entities), None, None
+
+    # 5. General Q&A via LLaMA
+    with span("retrieval"):
+        passages = find_relevant_passages(user_input)
+    if not passages:
+        REPLIES.inc("no_context")
+        return "❌ I couldn't find relevant information. Try rephrasing your question.", None, None
+
+    # Earlier turns and retrieved passages share one budget; history gets
+    # at most HISTORY_SHARE of it, newest turns first
+    with span("prompt_build"):
+        conversation, history = fit_history(
+            session["history"], int(PROMPT_TOKEN_BUDGET * HISTORY_SHARE))
+        full_context, selected = build_context(
+            passages, PROMPT_TOKEN_BUDGET - estimate_tokens(conversation))
+
+    with span("cache_lookup"):
+        key = cache_key(user_input, [(score, url, {"text": text})
+                                     for score, url, text in selected], history)
+        cached = ANSWER_CACHE.get(key)
+    if cached is not None:
+        REPLIES.inc("cached")
+        with span("link_conversion"):
+            return convert_links_to_html(cached), None, key
+
+    prompt = f"""
+You are an expert assistant for Sri Lanka Telecom (SLT), helping users with their questions based on official content from www.slt.lk.
+{conversation}
 🧑 User Question:
 {user_input}
 
@@ -195,12 +413,202 @@ You are an expert assistant for Sri Lanka Telecom (SLT), helping users with thei
 
 Answer:
 """
+    PROMPT_TOKENS.observe(PROMPT_STATS.record(prompt, len(selected)))
+    REPLIES.inc("llm")
+    return None, prompt, key
+
+
+def save_turn(session_id, session, user_input, reply, remember=True):
+    # Only Q&A turns go into the history: canned and branch replies add
+    # nothing to later prompts, and would split the answer cache keys
+    if remember:
+        add_turn(session, "user", user_input)
+        add_turn(session, "assistant", reply)
+    SESSION_STORE.save(session_id, session)
+
+
+def with_session(response, session_id):
+    response.headers[SESSION_HEADER] = session_id
+    response.set_cookie(SESSION_COOKIE, session_id, max_age=SESSION_TTL,
+                        httponly=True, samesite="Lax")
+    return response
+
+
+@app.route("/chat", methods=["POST"])
+def chat():
+    try:
+        data = request.get_json()
+        user_input = data.get("message", "").strip().lower()
+        session_id = session_id_from_request(request)
+
+        if not user_input:
+            return jsonify({"error": "❌ Empty message provided."}), 400
+
+        session = SESSION_STORE.get(session_id)
+        reply, prompt, key = prepare_reply(user_input, session)
+        if prompt is None:
+            save_turn(session_id, session, user_input, reply, remember=key is not None)
+            return with_session(jsonify({"reply": reply}), session_id)
+
+        start = time.perf_counter()
         answer = query_ollama(prompt)
-        return jsonify({"reply": convert_links_to_html(answer)})
+        ANSWER_CACHE.put(key, answer, time.perf_counter() - start)
+        save_turn(session_id, session, user_input, answer)
+        with span("link_conversion"):
+            html = convert_links_to_html(answer)
+        return with_session(jsonify({"reply": html,
+                                     "prompt_tokens": estimate_tokens(prompt)}), session_id)
 
     except Exception as e:
         return jsonify({"error": f"❌ Server error: {str(e)}"}), 500
 
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    # Same flow as /chat, but LLM tokens are pushed as server-sent events:
+    #   event: token  data: {"text": "..."}   (repeated)
+    #   event: done   data: {"prompt_tokens": n, "timings": {...}}
+    #   event: error  data: {"error": "..."}
+    # "timings" is only sent when the request has the debug timing header.
+    try:
+        data = request.get_json()
+        user_input = data.get("message", "").strip().lower()
+        session_id = session_id_from_request(request)
+
+        if not user_input:
+            return jsonify({"error": "❌ Empty message provided."}), 400
+
+        session = SESSION_STORE.get(session_id)
+        reply, prompt, key = prepare_reply(user_input, session)
+
+    except Exception as e:
+        return jsonify({"error": f"❌ Server error: {str(e)}"}), 500
+
+    trace = tracing.current_trace()
+    debug = DEBUG_TIMING_HEADER in request.headers
+
+    def done_event(payload):
+        trace.finish(200)
+        if debug:
+            payload["timings"] = trace.timings()
+        return sse_event("done", payload)
+
+    def generate():
+        trace.activate()
+        try:
+            yield from stream_reply()
+        finally:
+            # Still unfinished here means the client went away mid-stream;
+            # count it as nginx's 499 "client closed request"
+            trace.finish(499)
+
+    def stream_reply():
+        if prompt is None:
+            save_turn(session_id, session, user_input, reply, remember=key is not None)
+            yield sse_event("token", {"text": reply})
+            yield done_event({})
+            return
+        tokens = []
+
+        def collect():
+            for token in stream_ollama(prompt):
+                tokens.append(token)
+                yield token
+
+        start = time.perf_counter()
+        try:
+            for text in convert_links_stream(collect()):
+                yield sse_event("token", {"text": text})
+        except Exception as e:
+            trace.finish(500)
+            yield sse_event("error", {"error": f"❌ Server error: {str(e)}"})
+            return
+        answer = "".join(tokens)
+        ANSWER_CACHE.put(key, answer, time.perf_counter() - start)
+        save_turn(session_id, session, user_input, answer)
+        yield done_event({"prompt_tokens": estimate_tokens(prompt)})
+
+    return with_session(Response(stream_with_context(generate()),
+                                 mimetype="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}),
+                        session_id)
+
+# -------------------------------
+# 🔄 Live Index Updates
+# -------------------------------
+
+
+@app.route("/index/delta", methods=["POST"])
+def index_delta():
+    # Called by `scraper.py --notify` after an incremental crawl. Only the
+    # worker that receives this applies the delta now; the others pick it
+    # up on their next retrieval, within DELTA_CHECK_INTERVAL.
+    if request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "❌ Index updates are only accepted from localhost."}), 403
+    try:
+        counts = sync_index_delta(force=True)
+        if counts is None:
+            return jsonify({"status": "✅ Index already up to date", "scraped_pages": len(INDEX)})
+        return jsonify({"status": "✅ Index updated", **counts, "scraped_pages": len(INDEX)})
+    except Exception as e:
+        return jsonify({"error": f"❌ Could not apply index delta: {str(e)}"}), 500
+
+# -------------------------------
+# 📊 Tracing & Metrics
+# -------------------------------
+
+
+@app.before_request
+def begin_trace():
+    tracing.start_trace(request.endpoint or "unmatched")
+
+
+@app.after_request
+def end_trace(response):
+    trace = tracing.current_trace()
+    if trace is None:
+        return response
+    # Streamed responses finish their trace when the stream ends
+    if not response.is_streamed:
+        trace.finish(response.status_code)
+    if DEBUG_TIMING_HEADER in request.headers:
+        response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+
+# Values already tracked elsewhere are read at scrape time
+GAUGES = [
+    ("slt_scraped_pages", "Pages in the search index.", "gauge",
+     lambda: len(INDEX)),
+    ("slt_active_sessions", "Chat sessions in the session store.", "gauge",
+     lambda: len(SESSION_STORE)),
+    ("slt_ollama_queue_depth", "Requests waiting for an Ollama slot.", "gauge",
+     lambda: ollama_client.metrics()["queue_depth"]),
+    ("slt_ollama_in_flight", "Generations running on Ollama.", "gauge",
+     lambda: ollama_client.metrics()["in_flight"]),
+    ("slt_ollama_coalesced_total", "Requests that shared an identical in-flight generation.", "counter",
+     lambda: ollama_client.metrics()["coalesced"]),
+    ("slt_ollama_rejected_total", "Requests that timed out waiting for an Ollama slot.", "counter",
+     lambda: ollama_client.metrics()["rejected"]),
+    ("slt_answer_cache_entries", "Answers held in the answer cache.", "gauge",
+     lambda: ANSWER_CACHE.stats()["entries"]),
+    ("slt_answer_cache_hits_total", "Answer cache hits.", "counter",
+     lambda: ANSWER_CACHE.stats()["hits"]),
+    ("slt_answer_cache_misses_total", "Answer cache misses.", "counter",
+     lambda: ANSWER_CACHE.stats()["misses"]),
+]
+for metric_name, description, kind, read in GAUGES:
+    tracing.REGISTRY.gauge(metric_name, description, read, kind)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(tracing.REGISTRY.render(), content_type=tracing.CONTENT_TYPE)
+
 # -------------------------------
 # ✅ Health Check Route
 # -------------------------------
@@ -211,7 +619,11 @@ def health():
     return jsonify({
         "status": "✅ SLT Chatbot is running",
         "scraped_pages": len(INDEX),
-        "branches_loaded": len(BRANCHES)
+        "branches_loaded": len(BRANCHES),
+        "ollama": ollama_client.metrics(),
+        "answer_cache": ANSWER_CACHE.stats(),
+        "active_sessions": len(SESSION_STORE),
+        "prompts": PROMPT_STATS.snapshot()
     })
 
 
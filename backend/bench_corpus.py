@@ -0,0 +1,94 @@
+"""Startup time and per-worker memory: index.json vs the mapped corpus.
+
+Each mode loads the pages and passage search index in a fresh process, the
+way a gunicorn worker would, then answers a few retrievals.
+
+Run from the backend folder:  python bench_corpus.py [--scale N]
+--scale replicates the shipped pages N times to mimic a larger crawl.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from chunking import passage_pages
+from corpus import write_corpus
+from search import load_or_build
+
+WORKER = r"""
+import json, sys, time
+start = time.perf_counter()
+from chunking import page_passages, passage_pages
+from corpus import Corpus
+from search import load_or_build
+mode, data_path, search_path = sys.argv[1:4]
+if mode == "json":
+    with open(data_path, encoding="utf8") as f:
+        pages = json.load(f)
+else:
+    pages = Corpus(data_path)
+# Same as app.load_passage_index; main() has already built the cache
+index = load_or_build(lambda: passage_pages(pages), data_path, search_path)
+startup = time.perf_counter() - start
+for q in ["fibre packages", "peo tv channels", "bill payment"]:
+    for _, doc in index.search(q, 12):
+        url, i = doc.rsplit("#", 1)
+        page_passages(pages[url])[int(i)]
+
+status = {}
+with open("/proc/self/status") as f:
+    for line in f:
+        key, _, value = line.partition(":")
+        if key in ("VmRSS", "RssAnon", "RssFile"):
+            status[key] = int(value.split()[0])
+print(json.dumps({"startup_ms": startup * 1000, **status}))
+"""
+
+
+def run_worker(mode, data_path, search_path):
+    out = subprocess.run([sys.executable, "-c", WORKER, mode, data_path, search_path],
+                         capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with open("data/index.json", encoding="utf8") as f:
+        pages = json.load(f)
+    if args.scale > 1:
+        pages = {f"{url}?copy={i}": data for i in range(args.scale)
+                 for url, data in pages.items()}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "index.json")
+        corpus_path = os.path.join(tmp, "corpus.bin")
+        with open(json_path, "w", encoding="utf8") as f:
+            json.dump(pages, f, ensure_ascii=False, indent=2)
+        write_corpus(corpus_path, pages)
+        # Like a worker after the first start: the passage index cache is
+        # up to date for each mode's source file
+        search_paths = {}
+        for mode, path in (("json", json_path), ("corpus", corpus_path)):
+            search_paths[mode] = os.path.join(tmp, f"{mode}_passage_index.json")
+            load_or_build(lambda: passage_pages(pages), path, search_paths[mode])
+
+        print(f"📚 {len(pages)} pages | index.json {os.path.getsize(json_path) / 1024:.0f} KB"
+              f" | corpus.bin {os.path.getsize(corpus_path) / 1024:.0f} KB")
+        print(f"{'mode':8} {'startup ms':>11} {'RSS KB':>9} {'anon KB':>9} {'file KB':>9}")
+        for mode, path in (("json", json_path), ("corpus", corpus_path)):
+            runs = [run_worker(mode, path, search_paths[mode]) for _ in range(args.runs)]
+            best = min(runs, key=lambda r: r["startup_ms"])
+            print(f"{mode:8} {best['startup_ms']:11.1f} {best['VmRSS']:9} "
+                  f"{best['RssAnon']:9} {best['RssFile']:9}")
+        print("anon = private to each worker; file = mapped pages shared via the page cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Branch lookup throughput: offline gazetteer + vectorized search vs the old path.
+
+The old path built a Nominatim geocoder per request and ran geopy's geodesic
+against every branch. Online geocoding is only measured with --nominatim,
+since OSM allows one request per second.
+
+Run from the backend folder:  python bench_geo.py [--nominatim]
+"""
+import argparse
+import json
+import time
+
+from geopy.distance import geodesic
+
+from geo import BranchLocator, Gazetteer
+
+QUERIES = [
+    "find branches near kandy", "galle", "branch in nuwara eliya", "negambo",
+    "where is the office in moratuwa", "jaffna", "kurunegala branch",
+    "batticaloa", "ja-ela", "matara office", "trinco", "kandi",
+]
+ROUNDS = 200
+
+
+def old_nearest(user_coords, branches, top_n=3):
+    # Previous find_nearest_branches from app.py, kept here as the baseline
+    distances = []
+    for branch in branches:
+        dist = geodesic(
+            user_coords, (branch["latitude"], branch["longitude"])).km
+        distances.append((branch, dist))
+    return sorted(distances, key=lambda x: x[1])[:top_n]
+
+
+def report(label, samples):
+    samples.sort()
+    total = sum(samples)
+    p50 = samples[len(samples) // 2] * 1000
+    p99 = samples[int(len(samples) * 0.99) - 1] * 1000
+    print(f"{label:28} {len(samples) / total:10.0f}/s  p50 {p50:8.3f} ms  p99 {p99:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nominatim", action="store_true",
+                        help="also time a few live Nominatim lookups (old path)")
+    args = parser.parse_args()
+
+    with open("data/branches.json", encoding="utf8") as f:
+        branches = json.load(f)
+    gazetteer = Gazetteer.load("data/gazetteer.json", "data/branches.json")
+    locator = BranchLocator(branches)
+
+    coords = []
+    for q in QUERIES:
+        place = gazetteer.resolve(q)
+        coords.append((place["latitude"], place["longitude"]))
+
+    resolve, old, new, end_to_end = [], [], [], []
+    for _ in range(ROUNDS):
+        for q, c in zip(QUERIES, coords):
+            start = time.perf_counter()
+            gazetteer.resolve(q)
+            resolve.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            old_nearest(c, branches)
+            old.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            locator.nearest(c)
+            new.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            place = gazetteer.resolve(q)
+            locator.nearest((place["latitude"], place["longitude"]))
+            end_to_end.append(time.perf_counter() - start)
+
+    print(f"📍 {len(branches)} branches, {len(gazetteer.names)} indexed names")
+    report("gazetteer resolve", resolve)
+    report("nearest: geodesic loop", old)
+    report("nearest: numpy haversine", new)
+    report("offline lookup end to end", end_to_end)
+
+    # Both searches must agree on which branches are nearest
+    mismatches = sum(
+        [b["name"] for b, _ in old_nearest(c, branches)] !=
+        [b["name"] for b, _ in locator.nearest(c)] for c in coords)
+    print(f"top-3 disagreements with geodesic: {mismatches}/{len(coords)}")
+
+    if args.nominatim:
+        from geopy.geocoders import Nominatim
+        samples = []
+        for q in QUERIES[:5]:
+            start = time.perf_counter()
+            Nominatim(user_agent="slt-location-finder").geocode(f"{q}, Sri Lanka")
+            samples.append(time.perf_counter() - start)
+            time.sleep(1)  # OSM usage policy
+        report("old path: nominatim geocode", samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Messages/second: compiled intent router vs the old /chat rule cascade.
+
+tests/test_intents.py checks that both classify MESSAGES the same way.
+
+Run from the backend folder:  python bench_router.py
+"""
+import json
+import time
+
+from intents import IntentRouter
+
+MESSAGES = [
+    "hi", "thank you", "bye", "near me", "find slt branches near me", "my location",
+    "kandy branch phone number", "what is the email of galle branch",
+    "nuwara eliya address", "contact details for negombo", "havelock town location",
+    "branch in kurunegala", "is there an office in matara", "4g coverage area",
+    "what are the fibre packages", "peo tv channels", "how do i pay my bill",
+    "what is the price of the 100gb anytime package for prepaid customers",
+    "i want to know about international roaming rates in the maldives",
+    "Jaffna", "colombo fort contact", "kotte email and phone",
+]
+ROUNDS = 2000
+
+
+def old_cascade(user_input, branches):
+    # Classification part of the previous prepare_reply, kept as the baseline
+    casual = {"hello", "hi", "thanks", "thank you", "bye"}
+    if user_input in casual:
+        return "casual", None, ()
+    if "near me" in user_input or user_input in ["me", "my location", "near"]:
+        return "ask_city", None, ()
+    for branch in branches:
+        name_lower = branch["name"].lower()
+        if name_lower in user_input:
+            fields = []
+            if "contact" in user_input or "phone" in user_input:
+                fields.append("phone")
+            if "email" in user_input:
+                fields.append("email")
+            if "address" in user_input or "location" in user_input:
+                fields.append("address")
+            if fields:
+                return "branch_info", branch["name"], tuple(fields)
+    location_keywords = ["branch", "location", "coverage", "area", "office"]
+    if any(k in user_input for k in location_keywords):
+        return "branch_search", None, ()
+    return "question", None, ()
+
+
+def new_route(router, user_input):
+    intent, entities = router.route(user_input)
+    name = "casual" if intent.get("keeps_state") else intent["name"]
+    if name != "branch_info":
+        return name, None, ()
+    return name, entities["branch"]["name"], tuple(entities["fields"])
+
+
+def rate(fn, repeats=5):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            for message in MESSAGES:
+                fn(message)
+        best = min(best, time.perf_counter() - start)
+    return ROUNDS * len(MESSAGES) / best
+
+
+def main():
+    with open("data/branches.json", encoding="utf8") as f:
+        branches = json.load(f)
+
+    start = time.perf_counter()
+    router = IntentRouter.load("data/intents.json", branches)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"🧭 {len(router.intents)} intents, {len(router.hits)} phrases, "
+          f"built in {build_ms:.1f} ms")
+
+    # The old loop is linear in branch count, so also time a 10x branch list
+    for scale in (1, 10):
+        scaled = branches + [{**b, "name": f"{b['name']} {i}"}
+                             for i in range(1, scale) for b in branches]
+        scaled_router = IntentRouter.load("data/intents.json", scaled)
+        old_rate = rate(lambda m: old_cascade(m.strip().lower(), scaled))
+        new_rate = rate(scaled_router.route)
+        print(f"{len(scaled):4} branches | old cascade {old_rate:9.0f} msgs/s | "
+              f"router {new_rate:9.0f} msgs/s ({new_rate / old_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare BM25 retrieval against the old linear substring scan.
+
+Run from the backend folder:  python bench_search.py
+"""
+import json
+import statistics
+import time
+
+from search import SearchIndex
+
+QUERIES = [
+    "fibre packages",
+    "peo tv channels",
+    "bill payment",
+    "4g lte prepaid packages",
+    "how to contact customer support",
+    "new broadband connection",
+    "megaline adsl price",
+    "international roaming",
+    "extra gb data add on",
+    "kaspersky internet security",
+    "enterprise solutions cloud",
+    "loyalty data offer",
+]
+ROUNDS = 50
+
+
+def score_relevance(query, data):
+    # Previous per-request scan from app.py, kept here as the baseline
+    query_words = query.lower().split()
+    text = data.get("text", "").lower()
+    if "ocr_images" in data:
+        text += " " + " ".join(img["text"].lower()
+                               for img in data["ocr_images"])
+    return sum(text.count(word) for word in query_words)
+
+
+def linear_scan(index, query, top_n=3):
+    scored = [(score_relevance(query, data), url)
+              for url, data in index.items()]
+    return sorted([s for s in scored if s[0] > 0], reverse=True)[:top_n]
+
+
+def timed(fn, *args):
+    samples = []
+    for _ in range(ROUNDS):
+        for q in QUERIES:
+            start = time.perf_counter()
+            fn(*args, q)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    with open("data/index.json", encoding="utf8") as f:
+        index = json.load(f)
+
+    start = time.perf_counter()
+    engine = SearchIndex.build(index)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print(f"📚 {len(index)} pages, {len(engine.postings)} terms, "
+          f"built in {build_ms:.1f} ms")
+
+    old_mean, old_p99 = timed(linear_scan, index)
+    new_mean, new_p99 = timed(lambda q: engine.search(q))
+    print(f"linear scan : mean {old_mean:.3f} ms  p99 {old_p99:.3f} ms")
+    print(f"bm25 index  : mean {new_mean:.3f} ms  p99 {new_p99:.3f} ms")
+    print(f"speedup     : {old_mean / new_mean:.1f}x")
+
+    overlaps = []
+    for q in QUERIES:
+        old = {url for _, url in linear_scan(index, q)}
+        new = {url for _, url in engine.search(q)}
+        overlap = len(old & new) / max(len(old), 1)
+        overlaps.append(overlap)
+        print(f"  {q!r:40} top-3 overlap {overlap:.0%}")
+    print(f"mean top-3 overlap: {statistics.mean(overlaps):.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Split scraped pages into passages and strip site-wide boilerplate.
+
+Navigation menus and footers are repeated on every page, often glued to the
+real content. Any run of SHINGLE_WORDS words that appears on at least
+BOILERPLATE_SHARE of the pages is treated as boilerplate and removed. The
+remaining text is packed into passages of whole sentences.
+
+Add passages to an existing index:  python chunking.py data/index.json
+"""
+import json
+import math
+import re
+import sys
+from collections import Counter
+
+SHINGLE_WORDS = 8
+BOILERPLATE_SHARE = 0.3
+MIN_BOILERPLATE_PAGES = 3
+MAX_PASSAGE_WORDS = 120
+MIN_PASSAGE_WORDS = 4
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    # Llama-style tokenizers average roughly four characters per token
+    return math.ceil(len(text) / 4)
+
+
+def _shingles(words):
+    return {" ".join(words[i:i + SHINGLE_WORDS])
+            for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def find_boilerplate(pages):
+    """Return the word shingles shared by too many pages to be content."""
+    counts = Counter()
+    for data in pages.values():
+        counts.update(_shingles(data.get("text", "").split()))
+    threshold = max(MIN_BOILERPLATE_PAGES, len(pages) * BOILERPLATE_SHARE)
+    return {shingle for shingle, n in counts.items() if n >= threshold}
+
+
+def strip_boilerplate(text, boilerplate):
+    """Return the runs of text left after removing boilerplate shingles."""
+    words = text.split()
+    keep = [True] * len(words)
+    for i in range(len(words) - SHINGLE_WORDS + 1):
+        if " ".join(words[i:i + SHINGLE_WORDS]) in boilerplate:
+            keep[i:i + SHINGLE_WORDS] = [False] * SHINGLE_WORDS
+
+    runs, current = [], []
+    for word, kept in zip(words, keep):
+        if kept:
+            current.append(word)
+        elif current:
+            runs.append(" ".join(current))
+            current = []
+    if current:
+        runs.append(" ".join(current))
+    return runs
+
+
+def pack_passages(runs, max_words=MAX_PASSAGE_WORDS):
+    """Pack sentences into passages of at most max_words, never splitting a
+    sentence unless it is longer than a whole passage."""
+    passages, current = [], []
+
+    def flush():
+        if len(current) >= MIN_PASSAGE_WORDS:
+            passages.append(" ".join(current))
+        current.clear()
+
+    for run in runs:
+        for sentence in SENTENCE_END.split(run):
+            words = sentence.split()
+            if len(current) + len(words) > max_words:
+                flush()
+            while len(words) > max_words:
+                passages.append(" ".join(words[:max_words]))
+                words = words[max_words:]
+            current.extend(words)
+        flush()  # boilerplate gaps are passage boundaries too
+    return passages
+
+
+def chunk_page(data, boilerplate=frozenset()):
+    # "text" already includes the OCR text, so ocr_images isn't re-added
+    return pack_passages(strip_boilerplate(data.get("text", ""), boilerplate))
+
+
+def page_passages(data):
+    # scraper.py stores boilerplate-free passages; older indexes get a plain split
+    return data.get("passages") or chunk_page(data)
+
+
+def passage_docs(url, data):
+    """{"<url>#<i>": {"text": passage}}, the search index's view of a page."""
+    return {f"{url}#{i}": {"text": text} for i, text in enumerate(page_passages(data))}
+
+
+def passage_pages(pages):
+    return {doc: passage for url, data in pages.items()
+            for doc, passage in passage_docs(url, data).items()}
+
+
+def add_passages(pages):
+    """Store "passages" on every page; return the URLs whose passages changed."""
+    boilerplate = find_boilerplate(pages)
+    changed = set()
+    for url, data in pages.items():
+        passages = chunk_page(data, boilerplate)
+        if data.get("passages") != passages:
+            data["passages"] = passages
+            changed.add(url)
+    return changed
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "data/index.json"
+    with open(path, encoding="utf8") as f:
+        pages = json.load(f)
+    add_passages(pages)
+    with open(path, "w", encoding="utf8") as f:
+        json.dump(pages, f, ensure_ascii=False, indent=2)
+    total = sum(len(data["passages"]) for data in pages.values())
+    print(f"✅ Added {total} passages to {len(pages)} pages in {path}")
@@ -0,0 +1,98 @@
+import threading
+
+from chunking import estimate_tokens
+
+DEDUPE_SHINGLE = 3      # words per shingle when comparing passages
+DEDUPE_THRESHOLD = 0.8  # Jaccard similarity above which passages are duplicates
+
+
+def _shingles(text):
+    words = text.lower().split()
+    if len(words) <= DEDUPE_SHINGLE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + DEDUPE_SHINGLE])
+            for i in range(len(words) - DEDUPE_SHINGLE + 1)}
+
+
+def _similar(a, b):
+    return len(a & b) / len(a | b) >= DEDUPE_THRESHOLD if a and b else False
+
+
+def build_context(passages, budget_tokens):
+    """Fill a token budget with the best distinct passages.
+
+    passages is [(score, url, text), ...], best first. Near-identical
+    passages are skipped, and a passage that doesn't fit is skipped in
+    favour of smaller ones further down. Returns (context, selected).
+    """
+    selected, seen, used = [], [], 0
+    pages = set()
+    for score, url, text in passages:
+        shingles = _shingles(text)
+        if any(_similar(shingles, other) for other in seen):
+            continue
+        cost = estimate_tokens(text) + (0 if url in pages else estimate_tokens(f"🔗 Page: {url}\n"))
+        if used + cost > budget_tokens:
+            continue
+        selected.append((score, url, text))
+        seen.append(shingles)
+        pages.add(url)
+        used += cost
+
+    # Group passages by page, pages in order of their best passage
+    by_page = {}
+    for _, url, text in selected:
+        by_page.setdefault(url, []).append(text)
+    blocks = [f"🔗 Page: {url}\n" + "\n".join(f"📄 {text}" for text in texts)
+              for url, texts in by_page.items()]
+    return "\n\n---\n\n".join(blocks), selected
+
+
+def format_history(turns):
+    if not turns:
+        return ""
+    lines = [f"{'User' if turn['role'] == 'user' else 'Assistant'}: {turn['text']}"
+             for turn in turns]
+    return "\n🗨️ Recent Conversation:\n" + "\n".join(lines) + "\n"
+
+
+def fit_history(history, budget_tokens):
+    """Keep the newest turns whose conversation block fits the budget.
+
+    Returns (block, kept turns); the block is "" when nothing fits.
+    """
+    kept = []
+    for turn in reversed(history):
+        if estimate_tokens(format_history([turn] + kept)) > budget_tokens:
+            break
+        kept.insert(0, turn)
+    return format_history(kept), kept
+
+
+class PromptStats:
+    """Running totals of prompt sizes sent to the LLM."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.prompt_tokens = 0
+        self.passages = 0
+        self.last_prompt_tokens = 0
+
+    def record(self, prompt, passages):
+        tokens = estimate_tokens(prompt)
+        with self._lock:
+            self.prompts += 1
+            self.prompt_tokens += tokens
+            self.passages += passages
+            self.last_prompt_tokens = tokens
+        return tokens
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "prompts": self.prompts,
+                "avg_prompt_tokens": round(self.prompt_tokens / self.prompts, 1) if self.prompts else 0.0,
+                "avg_passages": round(self.passages / self.prompts, 2) if self.prompts else 0.0,
+                "last_prompt_tokens": self.last_prompt_tokens,
+            }
@@ -0,0 +1,132 @@
+"""Compact, memory-mappable page store.
+
+Layout (little endian):
+
+    header   magic b"SLTC", version u32, page count u32, url block size u32
+    offsets  one (body offset u64, body length u32) pair per page
+    urls     page URLs joined by "\\n", UTF-8
+    bodies   one compact UTF-8 JSON object per page
+
+Only the URL list and offset table are read at startup. Page bodies stay in
+the mapped file, shared between workers through the OS page cache, and are
+decoded on access.
+
+The corpus is what the app serves from, and the app only reads a page's
+"passages". Those are built from "text", which already holds the OCR text,
+so a page with passages is stored without "text" and "ocr_images";
+index.json keeps the full page for scraper.py.
+
+Convert an existing index:  python corpus.py data/index.json data/corpus.bin
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import MutableMapping
+
+MAGIC = b"SLTC"
+VERSION = 1
+HEADER = struct.Struct("<4sIII")
+ENTRY = struct.Struct("<QI")
+FOLDED_KEYS = ("text", "ocr_images")    # covered by "passages"
+
+
+def encode_body(page):
+    if page.get("passages"):
+        page = {key: value for key, value in page.items() if key not in FOLDED_KEYS}
+    return json.dumps(page, ensure_ascii=False, separators=(",", ":")).encode("utf8")
+
+
+def write_corpus(path, pages):
+    urls = list(pages)
+    bodies = [encode_body(pages[url]) for url in urls]
+    url_block = "\n".join(urls).encode("utf8")
+
+    offset = HEADER.size + ENTRY.size * len(urls) + len(url_block)
+    table = bytearray()
+    for body in bodies:
+        table += ENTRY.pack(offset, len(body))
+        offset += len(body)
+
+    # Write to a temp file first so running workers never map half a file
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(urls), len(url_block)))
+        f.write(table)
+        f.write(url_block)
+        for body in bodies:
+            f.write(body)
+    os.replace(tmp, path)
+
+
+class Corpus(MutableMapping):
+    """Read-only mapped corpus that behaves like the old INDEX dict.
+
+    Writes (from applied index deltas) go to an in-memory overlay; the file
+    on disk is never modified.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, url_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a v{VERSION} corpus file")
+
+        table_end = HEADER.size + ENTRY.size * count
+        urls = self._map[table_end:table_end + url_size].decode("utf8")
+        self._entries = {}
+        for i, url in enumerate(urls.split("\n") if count else []):
+            self._entries[url] = ENTRY.unpack_from(self._map, HEADER.size + ENTRY.size * i)
+
+        self._overlay = {}
+        self._removed = set()
+
+    def __getitem__(self, url):
+        if url in self._overlay:
+            return self._overlay[url]
+        if url in self._removed or url not in self._entries:
+            raise KeyError(url)
+        offset, length = self._entries[url]
+        return json.loads(self._map[offset:offset + length].decode("utf8"))
+
+    def __setitem__(self, url, page):
+        self._overlay[url] = page
+        self._removed.discard(url)
+
+    def __delitem__(self, url):
+        if url not in self:
+            raise KeyError(url)
+        self._overlay.pop(url, None)
+        if url in self._entries:
+            self._removed.add(url)
+
+    def __contains__(self, url):
+        return url in self._overlay or (url in self._entries and url not in self._removed)
+
+    def __iter__(self):
+        for url in self._entries:
+            if url not in self._removed:
+                yield url
+        for url in self._overlay:
+            if url not in self._entries:
+                yield url
+
+    def __len__(self):
+        extra = sum(1 for url in self._overlay if url not in self._entries)
+        return len(self._entries) - len(self._removed) + extra
+
+    def close(self):
+        self._map.close()
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else "data/index.json"
+    dst = sys.argv[2] if len(sys.argv) > 2 else "data/corpus.bin"
+    with open(src, encoding="utf8") as f:
+        pages = json.load(f)
+    write_corpus(dst, pages)
+    print(f"✅ Wrote {len(pages)} pages to {dst} "
+          f"({os.path.getsize(src) / 1024:.0f} KB → {os.path.getsize(dst) / 1024:.0f} KB)")
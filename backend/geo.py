@@ -0,0 +1,127 @@
+import difflib
+import json
+import re
+from functools import lru_cache
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+MAX_NAME_WORDS = 4      # longest place name, in words
+FUZZY_CUTOFF = 0.8
+MIN_FUZZY_LENGTH = 4    # don't fuzzy-match short words like "me" or "is"
+
+
+def normalize_place(text):
+    return " ".join(WORD_PATTERN.findall(text.lower()))
+
+
+# -------------------------------
+# 🗺️ Offline Gazetteer
+# -------------------------------
+
+
+class Gazetteer:
+    """Offline place-name lookup built from gazetteer and branch entries.
+
+    Names and aliases are indexed in normalized form ("Ja-Ela" -> "ja ela",
+    also "jaela"). Fuzzy candidates are bucketed by first letter so typo
+    matching only compares against a handful of names.
+    """
+
+    def __init__(self, places):
+        self.names = {}          # normalized name -> place
+        self.buckets = {}        # first letter -> [normalized names]
+        for place in places:
+            for name in [place["name"], *place.get("aliases", [])]:
+                key = normalize_place(name)
+                for variant in {key, key.replace(" ", "")}:
+                    if variant and variant not in self.names:
+                        self.names[variant] = place
+                        self.buckets.setdefault(variant[0], []).append(variant)
+
+    @classmethod
+    def load(cls, *paths):
+        places = []
+        for path in paths:
+            with open(path, encoding="utf8") as f:
+                places.extend(json.load(f))
+        return cls(places)
+
+    def _fuzzy(self, phrase):
+        candidates = self.buckets.get(phrase[0], [])
+        match = difflib.get_close_matches(phrase, candidates, n=1, cutoff=FUZZY_CUTOFF)
+        return self.names[match[0]] if match else None
+
+    def resolve(self, text):
+        """Find the place named in free text, or None.
+
+        Exact phrases win over fuzzy ones and longer phrases over shorter,
+        so "nuwara eliya" beats "eliya" and "kandy" beats "kandi".
+        """
+        words = normalize_place(text).split()
+        phrases = [" ".join(words[i:i + n])
+                   for n in range(min(MAX_NAME_WORDS, len(words)), 0, -1)
+                   for i in range(len(words) - n + 1)]
+        for phrase in phrases:
+            if phrase in self.names:
+                return self.names[phrase]
+        for phrase in phrases:
+            if len(phrase) >= MIN_FUZZY_LENGTH:
+                place = self._fuzzy(phrase)
+                if place:
+                    return place
+        return None
+
+
+# -------------------------------
+# 📏 Nearest Branch Search
+# -------------------------------
+
+
+class BranchLocator:
+    """Vectorized haversine search over precomputed branch coordinates."""
+
+    def __init__(self, branches):
+        self.branches = branches
+        coords = np.radians(np.array(
+            [(b["latitude"], b["longitude"]) for b in branches], dtype=float).reshape(-1, 2))
+        self.lat = coords[:, 0]
+        self.lon = coords[:, 1]
+        self.cos_lat = np.cos(self.lat)
+
+    def distances(self, lat, lon):
+        lat, lon = np.radians(lat), np.radians(lon)
+        a = (np.sin((self.lat - lat) / 2) ** 2 +
+             np.cos(lat) * self.cos_lat * np.sin((self.lon - lon) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+    def nearest(self, coords, top_n=3):
+        """Return [(branch, distance_km), ...] closest first."""
+        if not self.branches:
+            return []
+        dist = self.distances(*coords)
+        top_n = min(top_n, len(dist))
+        idx = np.argpartition(dist, top_n - 1)[:top_n]
+        idx = idx[np.argsort(dist[idx])]
+        return [(self.branches[i], float(dist[i])) for i in idx]
+
+
+# -------------------------------
+# 🌐 Nominatim Fallback
+# -------------------------------
+
+_geolocator = None
+
+
+@lru_cache(maxsize=1024)
+def nominatim_geocode(query):
+    """Online fallback; returns (lat, lon, address) or None. Results are cached."""
+    global _geolocator
+    if _geolocator is None:
+        from geopy.geocoders import Nominatim
+        _geolocator = Nominatim(user_agent="slt-location-finder", timeout=5)
+    location = _geolocator.geocode(f"{query}, Sri Lanka")
+    if not location:
+        return None
+    return location.latitude, location.longitude, location.address
@@ -0,0 +1,119 @@
+import json
+import re
+from collections import namedtuple
+
+# intent is the matching entry from data/intents.json, or FALLBACK_INTENT
+Route = namedtuple("Route", "intent entities")
+FALLBACK_INTENT = {"name": "question"}
+
+
+def trie_regex(phrases):
+    """Compile phrases into one regex shaped like a prefix trie.
+
+    Shared prefixes are matched once, so the pattern costs about the same
+    however many phrases it holds. Optional tails are greedy, so the
+    longest phrase at a position wins.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        alts = [re.escape(ch) + build(child)
+                for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class IntentRouter:
+    """Classifies a chat message with one compiled regex.
+
+    Intents, their trigger phrases and the requested-field keywords come
+    from data/intents.json; branch names come from branches.json. Intents
+    are tried in file order and the first match wins. An intent matches if
+    the whole message equals one of its `exact` phrases or contains one of
+    its `contains` phrases, and every entity it `requires` was found.
+    """
+
+    def __init__(self, config, branches):
+        self.intents = config["intents"]
+        self.branches = branches
+        self.field_names = list(config["fields"])
+
+        self.exact = {}          # whole message -> intent numbers
+        targets = {}             # phrase -> [(kind, value), ...]
+        for i, intent in enumerate(self.intents):
+            for phrase in intent.get("exact", []):
+                self.exact.setdefault(phrase.lower(), set()).add(i)
+            for phrase in intent.get("contains", []):
+                targets.setdefault(phrase.lower(), []).append(("intent", i))
+        for field, words in config["fields"].items():
+            for word in words:
+                targets.setdefault(word.lower(), []).append(("field", field))
+        for b, branch in enumerate(branches):
+            targets.setdefault(branch["name"].lower(), []).append(("branch", b))
+
+        # Phrases that are a prefix of a longer match at the same position
+        # are folded into that match's hits, so one match per start
+        # position is enough. Hits are (intents, branches, fields).
+        self.pattern = re.compile(trie_regex(targets))
+        self.hits = {}
+        for phrase in targets:
+            values = [v for other, vs in targets.items()
+                      if phrase.startswith(other) for v in vs]
+            self.hits[phrase] = tuple(
+                frozenset(value for kind, value in values if kind == wanted)
+                for wanted in ("intent", "branch", "field"))
+
+        # (intent number, has trigger phrases, needs branch, needs fields)
+        self._plan = [(i, bool(intent.get("exact") or intent.get("contains")),
+                       "branch" in intent.get("requires", []),
+                       "fields" in intent.get("requires", []))
+                      for i, intent in enumerate(self.intents)]
+        # Whole-message phrases always route the same way, so resolve them now
+        self._exact_routes = {phrase: self._route(phrase) for phrase in self.exact}
+
+    @classmethod
+    def load(cls, path, branches):
+        with open(path, encoding="utf8") as f:
+            return cls(json.load(f), branches)
+
+    def route(self, message):
+        message = message.strip().lower()
+        if message in self._exact_routes:
+            return self._exact_routes[message]
+        return self._route(message)
+
+    def _route(self, message):
+        matched = set(self.exact.get(message, ()))
+        branches, fields = set(), set()
+        # Resume one character after each match start so overlapping
+        # phrases are still found; the regex engine scans ahead in C.
+        search = self.pattern.search
+        m = search(message)
+        while m:
+            intents, found_branches, found_fields = self.hits[m.group()]
+            matched |= intents
+            branches |= found_branches
+            fields |= found_fields
+            m = search(message, m.start() + 1)
+
+        entities = {
+            # First branch in branches.json order, as the old loop did
+            "branch": self.branches[min(branches)] if branches else None,
+            "fields": [f for f in self.field_names if f in fields],
+        }
+        for i, triggered, needs_branch, needs_fields in self._plan:
+            if triggered and i not in matched:
+                continue
+            if (needs_branch and not branches) or (needs_fields and not fields):
+                continue
+            return Route(self.intents[i], entities)
+        return Route(FALLBACK_INTENT, entities)
@@ -1,15 +1,258 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from tracing import record
 
 OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
 
 #OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
 
-def query_ollama(prompt, model="llama3.1"):
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False
-    }
-    res = requests.post(OLLAMA_URL, json=payload)
-    res.raise_for_status()
-    return res.json()["response"]
+DEFAULT_MODEL = "llama3.1"
+MAX_CONCURRENT = 2          # generations allowed on the local model at once
+QUEUE_TIMEOUT = 300         # seconds a request may wait for a free slot
+CONNECT_TIMEOUT, READ_TIMEOUT = 5, 300  # seconds
+
+
+def parse_stream_line(line):
+    """Return (text, done) for one line of Ollama's NDJSON stream."""
+    # Ollama streams one JSON object per line until "done" is true
+    if not line:
+        return "", False
+    chunk = json.loads(line)
+    if chunk.get("error"):
+        raise RuntimeError(chunk["error"])
+    return chunk.get("response", ""), chunk.get("done", False)
+
+
+class QueueStats:
+    """Counters for requests waiting on, and running against, Ollama."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def enter_queue(self):
+        with self._lock:
+            self.waiting += 1
+            self.requests += 1
+
+    def leave_queue(self, waited, acquired=True):
+        with self._lock:
+            self.waiting -= 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            if acquired:
+                self.in_flight += 1
+            else:
+                self.rejected += 1
+
+    def finish(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def add_coalesced(self):
+        with self._lock:
+            self.coalesced += 1
+
+    def snapshot(self):
+        with self._lock:
+            served = self.requests - self.waiting
+            return {
+                "queue_depth": self.waiting,
+                "in_flight": self.in_flight,
+                "requests": self.requests,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "wait_seconds_total": round(self.wait_total, 4),
+                "wait_seconds_avg": round(self.wait_total / served, 4) if served else 0.0,
+                "wait_seconds_max": round(self.wait_max, 4),
+            }
+
+
+class OllamaClient:
+    """Thread-safe Ollama client with a pooled session and bounded concurrency.
+
+    Identical (model, prompt) pairs that are already being generated share
+    the in-flight upstream call instead of queueing a second one.
+    """
+
+    def __init__(self, url=OLLAMA_URL, model=DEFAULT_MODEL,
+                 max_concurrent=MAX_CONCURRENT, queue_timeout=QUEUE_TIMEOUT,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=2, pool_size=10):
+        self.url = url
+        self.model = model
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.timeout = (connect_timeout, read_timeout)
+        self.stats = QueueStats()
+
+        # Only retry failures where the model never started generating
+        retry = Retry(total=retries, connect=retries, read=0,
+                      status_forcelist=[502, 503, 504],
+                      allowed_methods=frozenset(["POST"]),
+                      backoff_factor=0.5, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                              max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    @contextmanager
+    def _slot(self):
+        self.stats.enter_queue()
+        start = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        waited = time.perf_counter() - start
+        self.stats.leave_queue(waited, acquired)
+        record("ollama_wait", waited)
+        if not acquired:
+            raise TimeoutError("Ollama is busy, please try again shortly.")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._slots.release()
+            self.stats.finish()
+            record("ollama_generate", time.perf_counter() - start)
+
+    def _post(self, prompt, model, stream):
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": stream
+        }
+        res = self.session.post(self.url, json=payload,
+                                timeout=self.timeout, stream=stream)
+        res.raise_for_status()
+        return res
+
+    def _generate(self, prompt, model):
+        with self._slot():
+            return self._post(prompt, model, stream=False).json()["response"]
+
+    def generate(self, prompt, model=None):
+        key = (model or self.model, prompt)
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            self.stats.add_coalesced()
+            return future.result()
+
+        try:
+            answer = self._generate(prompt, model)
+            future.set_result(answer)
+            return answer
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stream(self, prompt, model=None):
+        # The slot is held until the stream is exhausted or closed.
+        with self._slot():
+            with self._post(prompt, model, stream=True) as res:
+                for line in res.iter_lines():
+                    text, done = parse_stream_line(line)
+                    if text:
+                        yield text
+                    if done:
+                        break
+
+    def metrics(self):
+        return self.stats.snapshot()
+
+
+class AsyncOllamaClient:
+    """asyncio front-end for OllamaClient, for use from an async server.
+
+    Requests run on worker threads through the wrapped client's slots, so
+    sync and async callers share one max_concurrent limit and one set of
+    queue stats. Identical prompts are coalesced onto one task.
+    """
+
+    def __init__(self, client=None):
+        self.client = client or OllamaClient()
+        self._in_flight = {}
+
+    async def _enter(self, slot):
+        # The slot is acquired on a worker thread; if the caller is cancelled
+        # while waiting, give the slot back as soon as the thread gets it
+        entering = asyncio.ensure_future(asyncio.to_thread(slot.__enter__))
+        try:
+            await asyncio.shield(entering)
+        except asyncio.CancelledError:
+            entering.add_done_callback(
+                lambda f: f.exception() is None and slot.__exit__(None, None, None))
+            raise
+
+    async def generate(self, prompt, model=None):
+        key = (model or self.client.model, prompt)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                asyncio.to_thread(self.client._generate, prompt, model))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.client.stats.add_coalesced()
+        # shield so one cancelled caller doesn't cancel the shared call
+        return await asyncio.shield(task)
+
+    async def stream(self, prompt, model=None):
+        slot = self.client._slot()
+        await self._enter(slot)
+        try:
+            res = await asyncio.to_thread(self.client._post, prompt, model, True)
+            lines = res.iter_lines()
+            try:
+                while True:
+                    line = await asyncio.to_thread(next, lines, None)
+                    if line is None:
+                        break
+                    text, done = parse_stream_line(line)
+                    if text:
+                        yield text
+                    if done:
+                        break
+            finally:
+                res.close()
+        finally:
+            slot.__exit__(None, None, None)
+
+    def metrics(self):
+        return self.client.metrics()
+
+
+client = OllamaClient()
+
+
+def query_ollama(prompt, model=DEFAULT_MODEL):
+    return client.generate(prompt, model)
+
+
+def stream_ollama(prompt, model=DEFAULT_MODEL):
+    return client.stream(prompt, model)
@@ -0,0 +1,280 @@
+"""Load test /chat against a stub Ollama server and report latency percentiles.
+
+Conversations are drawn from the recorded mix in data/loadtest_questions.json
+with a fixed seed, so two runs send the same requests in the same order per
+user. By default the app runs in-process on a free port with a fresh
+in-memory answer cache, no Nominatim fallback and the stub in place of
+Ollama; --url drives an already running server instead. Against a
+multi-worker server the "server stages" report comes from the one worker
+that answered the /metrics request, so treat it as a sample, not a total.
+
+Run from the backend folder:
+    python loadtest.py --conversations 200 --users 8
+    python loadtest.py --stream --fail-p95 500     # exit 1 if p95 > 500 ms
+"""
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+STUB_ANSWER = ("Here is what I found about SLT services. See "
+               "https://www.slt.lk/en/personal/broadband for the latest packages and prices.")
+
+
+# -------------------------------
+# 🤖 Stub Ollama
+# -------------------------------
+
+
+class StubOllama(ThreadingHTTPServer):
+    """Answers /api/generate like Ollama, with a fixed delay per token."""
+
+    daemon_threads = True
+
+    def __init__(self, first_token_delay, token_delay):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        super().__init__(("127.0.0.1", 0), StubHandler)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/generate"
+
+    def handle_error(self, request, client_address):
+        # Pooled clients reset idle keep-alive connections; that's not an error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        words = [word + " " for word in STUB_ANSWER.split()]
+        time.sleep(self.server.first_token_delay)
+
+        if not payload.get("stream"):
+            time.sleep(self.server.token_delay * len(words))
+            body = json.dumps({"response": "".join(words), "done": True}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for word in words + [None]:
+                line = json.dumps({"response": word or "", "done": word is None}).encode() + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+                if word:
+                    time.sleep(self.server.token_delay)
+            self.wfile.write(b"0\r\n\r\n")
+        except ConnectionError:
+            pass    # the app stopped reading, e.g. its client disconnected
+
+
+def serve_in_thread(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_local_app(stub_url, cache):
+    """Import app.py, point it at the stub and serve it on a free port."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    import app
+    from answer_cache import AnswerCache
+
+    app.ollama_client.url = stub_url
+    app.NOMINATIM_FALLBACK = False
+    # A fresh cache per run keeps runs comparable; max_entries=0 disables it
+    app.ANSWER_CACHE = AnswerCache(max_entries=500 if cache else 0,
+                                   source_path=app.INDEX_PATH)
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args):
+            pass
+
+    server = serve_in_thread(make_server("127.0.0.1", 0, app.app, threaded=True,
+                                         request_handler=QuietHandler))
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+# -------------------------------
+# 🚦 Load Generation
+# -------------------------------
+
+
+def plan_conversations(mix, count, seed):
+    rng = random.Random(seed)
+    return rng.choices(mix, weights=[c["weight"] for c in mix], k=count)
+
+
+def send(http, base_url, message, stream):
+    """Return (seconds, time to first token or None, ok)."""
+    start = time.perf_counter()
+    if not stream:
+        res = http.post(f"{base_url}/chat", json={"message": message}, timeout=120)
+        return time.perf_counter() - start, None, res.ok and "reply" in res.json()
+
+    first_token, ok = None, False
+    with http.post(f"{base_url}/chat/stream", json={"message": message},
+                   timeout=120, stream=True) as res:
+        for line in res.iter_lines(decode_unicode=True):
+            if line == "event: token" and first_token is None:
+                first_token = time.perf_counter() - start
+            elif line == "event: done":
+                ok = res.ok
+    return time.perf_counter() - start, first_token, ok
+
+
+def run_conversation(base_url, conversation, stream):
+    # One requests.Session per conversation, so the session cookie (and
+    # with it the chat history / awaiting_city state) carries across turns
+    results = []
+    with requests.Session() as http:
+        for message in conversation["turns"]:
+            try:
+                seconds, first_token, ok = send(http, base_url, message, stream)
+            except requests.RequestException:
+                seconds, first_token, ok = None, None, False
+            results.append((message, seconds, first_token, ok))
+    return results
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+def summarize(latencies):
+    ms = [s * 1000 for s in latencies]
+    return {
+        "count": len(ms),
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "max_ms": round(max(ms), 2) if ms else 0.0,
+    }
+
+
+STAGE_LABEL = re.compile(r'stage="([^"]*)"')
+
+
+def stage_averages(metrics_text):
+    """Average ms per stage from the /metrics histogram sums and counts."""
+    sums, counts = {}, {}
+    for line in metrics_text.splitlines():
+        for suffix, target in (("_sum", sums), ("_count", counts)):
+            prefix = f"slt_stage_duration_seconds{suffix}{{"
+            if line.startswith(prefix):
+                labels, value = line[len(prefix):].rsplit("} ", 1)
+                stage = STAGE_LABEL.search(labels).group(1)
+                # One series per pid; add them up in case several are shown
+                target[stage] = target.get(stage, 0.0) + float(value)
+    return {stage: round(sums[stage] / counts[stage] * 1000, 3)
+            for stage in sorted(sums) if counts.get(stage)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--users", type=int, default=8, help="concurrent conversations")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mix", default="data/loadtest_questions.json")
+    parser.add_argument("--stream", action="store_true", help="use /chat/stream")
+    parser.add_argument("--no-cache", action="store_true", help="disable the answer cache")
+    parser.add_argument("--first-token-ms", type=float, default=150, help="stub Ollama delay before the first token")
+    parser.add_argument("--token-ms", type=float, default=10, help="stub Ollama delay per token")
+    parser.add_argument("--url", help="drive a running server instead of an in-process app "
+                                      "(server stages then cover one worker only)")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--fail-p95", type=float, help="exit 1 if overall p95 exceeds this many ms")
+    args = parser.parse_args()
+
+    with open(args.mix, encoding="utf8") as f:
+        mix = json.load(f)
+    conversations = plan_conversations(mix, args.conversations, args.seed)
+
+    base_url = args.url
+    if not base_url:
+        stub = serve_in_thread(StubOllama(args.first_token_ms / 1000, args.token_ms / 1000))
+        base_url = start_local_app(stub.url, cache=not args.no_cache)
+
+    print(f"🚦 {len(conversations)} conversations, {args.users} concurrent users -> {base_url}"
+          f"{' (stream)' if args.stream else ''}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.users) as pool:
+        turns = [turn for results in pool.map(lambda c: run_conversation(base_url, c, args.stream),
+                                              conversations)
+                 for turn in results]
+    elapsed = time.perf_counter() - start
+
+    ok = [t for t in turns if t[3]]
+    by_message = {}
+    for message, seconds, _, _ in ok:
+        by_message.setdefault(message, []).append(seconds)
+    report = {
+        "requests": len(turns),
+        "errors": len(turns) - len(ok),
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(len(turns) / elapsed, 2),
+        "latency": summarize([t[1] for t in ok]),
+        "messages": {m: summarize(s) for m, s in sorted(by_message.items())},
+    }
+    if args.stream:
+        report["first_token"] = summarize([t[2] for t in ok if t[2] is not None])
+    try:
+        report["stage_avg_ms"] = stage_averages(requests.get(f"{base_url}/metrics", timeout=10).text)
+    except requests.RequestException:
+        report["stage_avg_ms"] = {}
+
+    latency = report["latency"]
+    print(f"✅ {report['requests']} requests in {report['elapsed_seconds']} s "
+          f"({report['throughput_rps']} req/s), {report['errors']} errors")
+    print(f"⏱️ p50 {latency['p50_ms']} ms | p95 {latency['p95_ms']} ms | "
+          f"p99 {latency['p99_ms']} ms | max {latency['max_ms']} ms")
+    if args.stream:
+        first = report["first_token"]
+        print(f"⚡ first token p50 {first['p50_ms']} ms | p95 {first['p95_ms']} ms")
+    print("\nslowest messages (p95):")
+    slowest = sorted(report["messages"].items(), key=lambda item: -item[1]["p95_ms"])
+    for message, stats in slowest[:8]:
+        print(f"  {stats['p95_ms']:9.2f} ms  x{stats['count']:<4} {message}")
+    if report["stage_avg_ms"]:
+        print("\nserver stages (avg):")
+        for stage, ms in report["stage_avg_ms"].items():
+            print(f"  {ms:10.3f} ms  {stage}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.fail_p95 is not None and latency["p95_ms"] > args.fail_p95:
+        print(f"❌ p95 {latency['p95_ms']} ms is over the {args.fail_p95} ms limit")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
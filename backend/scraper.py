@@ -1,20 +1,39 @@
 import os
 import json
 import time
+import hashlib
+import argparse
+import threading
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse, urlunparse
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
 from PIL import Image
 from io import BytesIO
 import pytesseract
 from llm_ollama import query_ollama
+from corpus import write_corpus
+from chunking import add_passages
 from tqdm import tqdm
 
 BASE_URL = "https://www.slt.lk"
-VISITED, DATA = set(), {}
-FAILED_IMAGES = set()
-MAX_DEPTH, TIMEOUT = 5, 1800  # seconds
-start_time = time.time()
+MAX_DEPTH, TIMEOUT = 5, 1800  # seconds per run; an unfinished crawl resumes next run
+FETCH_WORKERS = 8
+OCR_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+HOST_DELAY = 0.25             # min seconds between requests to the same host
+CHECKPOINT_EVERY = 25         # pages
+INDEX_PATH = "data/index.json"
+CORPUS_PATH = "data/corpus.bin"
+CHECKPOINT_PATH = "data/crawl_checkpoint.json"
+VALIDATORS_PATH = "data/validators.json"
+OCR_CACHE_PATH = "data/ocr_cache.json"
+DELTA_PATH = "data/index_delta.json"
+DELTA_DIR = "data/deltas"       # every delta by "created", for workers that fell behind
+DELTA_HISTORY = 20            # archived deltas kept
+SKIP_IMAGE_TYPES = (".svg", ".webp", ".gif")
+MIN_IMAGE_BYTES = 1024 * 50
 
 
 def normalize(url):
@@ -22,32 +41,241 @@ def normalize(url):
     return urlunparse(parsed._replace(query="", fragment="")).rstrip("/")
 
 
-def extract_ocr(img_url):
-    try:
-        if any(img_url.lower().endswith(x) for x in [".svg", ".webp", ".gif"]):
+def page_content(data):
+    # What scrape_page extracts; index.json also stores derived keys like "passages"
+    return {key: data.get(key) for key in ("title", "text", "ocr_images")}
+
+
+def ocr_image_bytes(content):
+    # Runs in the OCR process pool, so it only takes and returns plain data
+    img = Image.open(BytesIO(content)).convert("RGB")
+    return pytesseract.image_to_string(img).strip()
+
+
+def read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding="utf8") as f:
+        return json.load(f)
+
+
+def write_json(path, payload, indent=None):
+    # Write to a temp file first so an interrupted run never leaves half a file
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp, path)
+
+
+class HostThrottle:
+    """Spaces out requests to each host by at least `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._next = {}
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, 0.0))
+            self._next[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Crawler:
+    """Breadth-first crawler with pooled fetches, pooled OCR and checkpoints.
+
+    Pages are fetched on a thread pool and image OCR runs on a process pool.
+    Images are OCR'd once per URL and once per content hash across the whole
+    crawl. The frontier and results are checkpointed so an interrupted crawl
+    picks up where it stopped.
+
+    `previous` is the last saved index. In incremental mode pages are
+    fetched with conditional GETs using the stored `validators`, and pages
+    whose content hash is unchanged are reused without parsing or OCR.
+    `ocr_cache` holds OCR results from earlier runs, so a re-parsed page
+    re-downloads its images but only OCRs those whose bytes changed.
+    """
+
+    def __init__(self, base_url=BASE_URL, max_depth=MAX_DEPTH,
+                 fetch_workers=FETCH_WORKERS, ocr_workers=OCR_WORKERS,
+                 host_delay=HOST_DELAY, time_budget=TIMEOUT,
+                 checkpoint_path=CHECKPOINT_PATH, previous=None,
+                 validators=None, incremental=False, ocr_cache=None):
+        self.base_url = normalize(base_url)
+        self.max_depth = max_depth
+        self.fetch_workers = fetch_workers
+        self.ocr_workers = ocr_workers
+        self.time_budget = time_budget
+        self.checkpoint_path = checkpoint_path
+        self.throttle = HostThrottle(host_delay)
+
+        self.frontier = deque([(self.base_url, 0)])
+        self.seen = {self.base_url}     # queued, in progress or done
+        self.visited = set()
+        self.data = {}
+        self.failed_images = set()
+        self.image_results = {}         # image url -> ocr entry or None
+        self.ocr_cache = ocr_cache or {}  # image url -> {"hash", "text"}, across runs
+        self.hash_results = {entry["hash"]: entry["text"]   # content sha1 -> ocr text
+                             for entry in self.ocr_cache.values()}
+        self.previous = previous or {}
+        self.validators = validators or {}  # url -> etag, last_modified, hash, links
+        self.incremental = incremental
+        self.changed = set()            # urls whose content is new or different
+        self.gone = set()               # urls that now return 404 / 410
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._image_futures = {}        # url / hash -> Future, shared between pages
+        self._io_pool = self._ocr_pool = None
+
+    # -------------------------------
+    # 💾 Checkpointing
+    # -------------------------------
+
+    def load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return False
+        with open(self.checkpoint_path, encoding="utf8") as f:
+            state = json.load(f)
+        self.frontier = deque(tuple(item) for item in state["frontier"])
+        self.visited = set(state["visited"])
+        self.seen = self.visited | {url for url, _ in self.frontier}
+        self.data = state["data"]
+        self.failed_images = set(state["failed_images"])
+        self.image_results = state["image_results"]
+        self.hash_results = state["hash_results"]
+        self.ocr_cache.update(state.get("ocr_cache", {}))
+        self.validators = state["validators"]
+        self.changed = set(state["changed"])
+        self.gone = set(state["gone"])
+        print(f"↩️ Resuming: {len(self.visited)} pages done, "
+              f"{len(self.frontier)} queued.")
+        return True
+
+    def save_checkpoint(self, in_progress=()):
+        if not self.checkpoint_path:
+            return
+        # Page and image workers keep writing these while the main thread
+        # checkpoints, so copy them under the lock before serializing
+        with self._lock:
+            shared = {
+                "failed_images": sorted(self.failed_images),
+                "image_results": dict(self.image_results),
+                "hash_results": dict(self.hash_results),
+                "ocr_cache": dict(self.ocr_cache),
+                "validators": dict(self.validators),
+            }
+        write_json(self.checkpoint_path, {
+            "frontier": list(in_progress) + list(self.frontier),
+            "visited": sorted(self.visited),
+            "data": self.data,
+            **shared,
+            "changed": sorted(self.changed),
+            "gone": sorted(self.gone),
+        })
+
+    def clear_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    # -------------------------------
+    # 🌐 Fetching
+    # -------------------------------
+
+    @property
+    def session(self):
+        # requests.Session is not thread-safe, so keep one per worker thread
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def get(self, url, **kwargs):
+        self.throttle.wait(url)
+        return self.session.get(url, **kwargs)
+
+    def enqueue(self, url, depth):
+        url = normalize(url)
+        if depth > self.max_depth or url in self.seen or not url.startswith(self.base_url):
+            return
+        self.seen.add(url)
+        self.frontier.append((url, depth))
+
+    # -------------------------------
+    # 🖼️ OCR
+    # -------------------------------
+
+    def _shared(self, key, pool, fn, *args):
+        # Run fn once per key; concurrent callers wait on the same future
+        with self._lock:
+            future = self._image_futures.get(key)
+            if future is None:
+                future = self._image_futures[key] = pool.submit(fn, *args)
+        return future.result()
+
+    def extract_ocr(self, img_url):
+        if img_url in self.image_results:
+            return self.image_results[img_url]
+        result = self._shared(("url", img_url), self._io_pool,
+                              self._download_and_ocr, img_url)
+        with self._lock:
+            self.image_results[img_url] = result
+        return result
+
+    def _download_and_ocr(self, img_url):
+        try:
+            if img_url.lower().endswith(SKIP_IMAGE_TYPES):
+                return None
+            res = self.get(img_url, timeout=5)
+            if len(res.content) < MIN_IMAGE_BYTES:
+                return None  # Skip tiny images
+            digest = hashlib.sha1(res.content).hexdigest()
+            text = self.hash_results.get(digest)
+            if text is None:
+                text = self._shared(("hash", digest), self._ocr_pool,
+                                    ocr_image_bytes, res.content)
+                with self._lock:
+                    self.hash_results[digest] = text
+            with self._lock:
+                self.ocr_cache[img_url] = {"hash": digest, "text": text}
+            return {"src": img_url, "text": text}
+        except Exception:
+            with self._lock:
+                self.failed_images.add(img_url)
             return None
-        res = requests.get(img_url, timeout=5)
-        if len(res.content) < 1024 * 50:
-            return None  # Skip tiny images
-        img = Image.open(BytesIO(res.content)).convert("RGB")
-        text = pytesseract.image_to_string(img).strip()
-        return {"src": img_url, "text": text}
-    except:
-        FAILED_IMAGES.add(img_url)
-        return None
-
-
-def crawl(url, depth=0):
-    if time.time() - start_time > TIMEOUT or depth > MAX_DEPTH:
-        return
-    url = normalize(url)
-    if url in VISITED or not url.startswith(BASE_URL):
-        return
-    print(f"Scraping: {url}")
-    VISITED.add(url)
-
-    try:
-        res = requests.get(url, timeout=10)
+
+    # -------------------------------
+    # 📄 Pages
+    # -------------------------------
+
+    def scrape_page(self, url):
+        """Return (page, links, changed); page is None if the URL is gone."""
+        old = self.validators.get(url) if url in self.previous else None
+        headers = {}
+        if self.incremental and old:
+            if old.get("etag"):
+                headers["If-None-Match"] = old["etag"]
+            if old.get("last_modified"):
+                headers["If-Modified-Since"] = old["last_modified"]
+
+        res = self.get(url, timeout=10, headers=headers)
+        if res.status_code == 304 and old:
+            return self.previous[url], old["links"], False
+        if res.status_code in (404, 410):
+            return None, [], True
+        if not 200 <= res.status_code < 300:
+            # 5xx, 403, 429, ...: an error page is not the page's content, so
+            # fail and let run() keep the last good copy
+            raise requests.HTTPError(f"{res.status_code} {res.reason} for {url}", response=res)
+
+        digest = hashlib.sha1(res.content).hexdigest()
+        if self.incremental and old and old.get("hash") == digest:
+            return self.previous[url], old["links"], False
+
         soup = BeautifulSoup(res.text, "html.parser")
         text = " ".join(p.get_text(strip=True)
                         for p in soup.find_all(["h1", "h2", "p", "li"]))
@@ -55,27 +283,176 @@ def crawl(url, depth=0):
         for img in soup.find_all("img"):
             src = img.get("src")
             if src:
-                ocr = extract_ocr(urljoin(url, src))
+                ocr = self.extract_ocr(urljoin(url, src))
                 if ocr:
                     ocrs.append(ocr)
         full = text + "\n" + "\n".join(img['text']
                                        for img in ocrs if img['text'])
         # summary = query_ollama(
         #     f"Summarize this page in bullet points:\n\n{full}")
-        DATA[url] = {
+        page = {
             "title": soup.title.string if soup.title else url,
             "text": full,
             "ocr_images": ocrs
         }
-        for a in soup.find_all("a", href=True):
-            crawl(urljoin(url, a["href"]), depth+1)
-    except Exception as e:
-        print(f"Error scraping {url}: {e}")
+        links = [urljoin(url, a["href"]) for a in soup.find_all("a", href=True)]
+        with self._lock:
+            self.validators[url] = {
+                "etag": res.headers.get("ETag"),
+                "last_modified": res.headers.get("Last-Modified"),
+                "hash": digest,
+                "links": links,
+            }
+        old_page = self.previous.get(url)
+        if old_page is not None and page_content(old_page) == page_content(page):
+            # Only the markup changed; keep the stored page and its passages
+            return old_page, links, False
+        return page, links, True
+
+    def run(self):
+        """Crawl until the frontier is empty or the time budget runs out.
+
+        Returns True when the crawl finished, False when it was cut short.
+        """
+        start_time = time.time()
+        pending = {}
+        # Image downloads get their own pool so page workers waiting on
+        # shared images can never starve them
+        with ThreadPoolExecutor(self.fetch_workers) as pages, \
+                ThreadPoolExecutor(self.fetch_workers) as self._io_pool, \
+                ProcessPoolExecutor(self.ocr_workers) as self._ocr_pool:
+            since_checkpoint = 0
+            while self.frontier or pending:
+                out_of_time = time.time() - start_time > self.time_budget
+                while self.frontier and len(pending) < self.fetch_workers and not out_of_time:
+                    url, depth = self.frontier.popleft()
+                    print(f"Scraping: {url}")
+                    pending[pages.submit(self.scrape_page, url)] = (url, depth)
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = pending.pop(future)
+                    self.visited.add(url)
+                    try:
+                        page, links, changed = future.result()
+                    except Exception as e:
+                        print(f"Error scraping {url}: {e}")
+                        if url in self.previous:
+                            self.data[url] = self.previous[url]  # keep last good copy
+                        continue
+                    if page is None:
+                        self.gone.add(url)
+                        continue
+                    self.data[url] = page
+                    if changed:
+                        self.changed.add(url)
+                    for link in links:
+                        self.enqueue(link, depth + 1)
+                    since_checkpoint += 1
+
+                if since_checkpoint >= CHECKPOINT_EVERY:
+                    self.save_checkpoint(pending.values())
+                    since_checkpoint = 0
+
+        finished = not self.frontier
+        if finished:
+            self.clear_checkpoint()
+        else:
+            self.save_checkpoint()
+            print(f"⏸️ Time budget reached, {len(self.frontier)} pages left. "
+                  f"Run again to resume.")
+        return finished
+
+    def build_delta(self, finished):
+        """Pages added, changed and removed relative to `previous`.
+
+        Pages the crawl did not reach only count as removed when it finished.
+        """
+        removed = sorted(url for url in self.previous
+                         if url not in self.data and
+                         (url in self.gone or finished))
+        return {
+            "created": time.time(),
+            "added": {url: self.data[url] for url in self.changed
+                      if url in self.data and url not in self.previous},
+            "changed": {url: self.data[url] for url in self.changed
+                        if url in self.data and url in self.previous},
+            "removed": removed,
+        }
+
+
+def merge_delta(pages, delta):
+    removed = set(delta["removed"])
+    merged = {url: page for url, page in pages.items() if url not in removed}
+    merged.update(delta["added"])
+    merged.update(delta["changed"])
+    return merged
+
+
+def archive_delta(delta, folder=DELTA_DIR, keep=DELTA_HISTORY):
+    """Save a copy as index_delta.<created>.json and prune the oldest."""
+    os.makedirs(folder, exist_ok=True)
+    write_json(os.path.join(folder, f"index_delta.{delta['created']!r}.json"), delta)
+    archived = sorted((os.path.join(folder, name) for name in os.listdir(folder)
+                       if name.startswith("index_delta.") and name.endswith(".json")),
+                      key=os.path.getmtime)
+    for path in archived[:-keep]:
+        os.remove(path)
 
 
 if __name__ == "__main__":
-    crawl(BASE_URL)
+    parser = argparse.ArgumentParser(description="Crawl slt.lk into data/index.json")
+    parser.add_argument("--fresh", action="store_true",
+                        help="ignore any saved checkpoint and start over")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-parse pages that changed since the last crawl")
+    parser.add_argument("--notify", metavar="URL",
+                        help="POST here when done so a running app applies the delta, "
+                             "e.g. http://127.0.0.1:5000/index/delta")
+    args = parser.parse_args()
+
     os.makedirs("data", exist_ok=True)
-    with open("data/index.json", "w", encoding="utf8") as f:
-        json.dump(DATA, f, ensure_ascii=False, indent=2)
-    print(f"✅ Finished. {len(DATA)} pages saved.")
+    previous = read_json(INDEX_PATH, {})
+    crawler = Crawler(previous=previous, validators=read_json(VALIDATORS_PATH, {}),
+                      incremental=args.incremental,
+                      ocr_cache=read_json(OCR_CACHE_PATH, {}))
+    if args.fresh:
+        crawler.clear_checkpoint()
+    else:
+        crawler.load_checkpoint()
+    finished = crawler.run()
+
+    delta = crawler.build_delta(finished)
+    # Running app workers apply a delta in place only if they hold its base
+    delta["base"] = read_json(DELTA_PATH, {}).get("created")
+    index = merge_delta(previous, delta)
+    # Boilerplate is judged across the whole site, so any page's passages
+    # can change; those pages join the delta
+    for url in add_passages(index):
+        if url not in delta["added"]:
+            delta["changed"][url] = index[url]
+    validators = {url: v for url, v in crawler.validators.items() if url in index}
+    write_json(VALIDATORS_PATH, validators)
+    # Keep OCR results for every image a saved page still shows, including
+    # pages reused unchanged this run
+    shown = {image["src"] for page in index.values() for image in page.get("ocr_images", [])}
+    write_json(OCR_CACHE_PATH, {src: entry for src, entry in crawler.ocr_cache.items()
+                                if src in shown})
+    write_json(INDEX_PATH, index, indent=2)
+    write_corpus(CORPUS_PATH, index)
+    # App workers treat a new delta file as "the index on disk changed", so
+    # it goes last; a worker that sees it can reload the files it describes.
+    # The archived copy lets a worker that missed deltas replay them in order.
+    archive_delta(delta)
+    write_json(DELTA_PATH, delta)
+    print(f"✅ Finished. {len(index)} pages saved "
+          f"(+{len(delta['added'])} ~{len(delta['changed'])} -{len(delta['removed'])}).")
+
+    if args.notify:
+        try:
+            requests.post(args.notify, timeout=30).raise_for_status()
+            print(f"🔄 Delta applied by {args.notify}")
+        except requests.RequestException as e:
+            print(f"⚠️ Could not notify {args.notify}: {e}")
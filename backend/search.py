@@ -0,0 +1,185 @@
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+# -------------------------------
+# 🔤 Tokenization
+# -------------------------------
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Scraped nav text is often glued together ("PackagesMegaline"), so split
+# lower→Upper boundaries before lowercasing.
+CAMEL_BOUNDARY = re.compile(r"(?<=[a-z])(?=[A-Z])")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for",
+    "from", "how", "i", "in", "is", "it", "me", "my", "of", "on", "or",
+    "the", "to", "what", "with", "you", "your",
+}
+
+
+def normalize_token(token):
+    # Light plural folding so "packages" matches "package"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    text = CAMEL_BOUNDARY.sub(" ", text).lower()
+    return [normalize_token(t) for t in TOKEN_PATTERN.findall(text)
+            if t not in STOPWORDS]
+
+
+def page_text(data):
+    text = data.get("text", "")
+    if "ocr_images" in data:
+        text += " " + " ".join(img["text"] for img in data["ocr_images"])
+    return text
+
+
+def file_fingerprint(path):
+    # mtime + size; hashing the file would cost every worker a full read
+    # of the corpus at startup. AnswerCache uses this too.
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+# -------------------------------
+# 📚 BM25 Inverted Index
+# -------------------------------
+
+
+class SearchIndex:
+    """Inverted index over scraped pages, ranked with Okapi BM25."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []        # doc number -> url (None once removed)
+        self.doc_lens = []       # doc number -> token count
+        self.postings = {}       # term -> [[doc number, term frequency], ...]
+        self.source = None       # fingerprint of the file the index was built from
+        self._reindex_docs()
+
+    def _reindex_docs(self):
+        self.doc_numbers = {url: doc for doc, url in enumerate(self.doc_ids)
+                            if url is not None}
+        self.total_len = sum(self.doc_lens)
+
+    @property
+    def avg_doc_len(self):
+        return self.total_len / len(self.doc_numbers) if self.doc_numbers else 0.0
+
+    @classmethod
+    def build(cls, pages, **kwargs):
+        index = cls(**kwargs)
+        for url, data in pages.items():
+            index.add_page(url, data)
+        return index
+
+    def add_page(self, url, data):
+        doc = len(self.doc_ids)
+        terms = Counter(tokenize(page_text(data)))
+        self.doc_ids.append(url)
+        self.doc_lens.append(sum(terms.values()))
+        self.doc_numbers[url] = doc
+        self.total_len += self.doc_lens[doc]
+        for term, tf in terms.items():
+            self.postings.setdefault(term, []).append([doc, tf])
+
+    def remove_page(self, url, data):
+        """Drop a page; data must be the content it was indexed with."""
+        doc = self.doc_numbers.pop(url, None)
+        if doc is None:
+            return
+        for term in set(tokenize(page_text(data))):
+            postings = [p for p in self.postings.get(term, []) if p[0] != doc]
+            if postings:
+                self.postings[term] = postings
+            else:
+                self.postings.pop(term, None)
+        self.total_len -= self.doc_lens[doc]
+        self.doc_ids[doc] = None
+        self.doc_lens[doc] = 0
+
+    def search(self, query, top_n=3):
+        """Return up to top_n (score, url) pairs, best first."""
+        n_docs = len(self.doc_numbers)
+        if not n_docs:
+            return []
+        avg_len = self.avg_doc_len or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens[doc] / avg_len)
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = heapq.nlargest(top_n, scores.items(), key=lambda x: x[1])
+        return [(score, self.doc_ids[doc]) for doc, score in best]
+
+    # -------------------------------
+    # 💾 Serialization
+    # -------------------------------
+
+    def to_dict(self):
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "source": self.source,
+            "doc_ids": self.doc_ids,
+            "doc_lens": self.doc_lens,
+            "postings": self.postings,
+        }
+
+    @classmethod
+    def from_dict(cls, payload):
+        index = cls(k1=payload["k1"], b=payload["b"])
+        index.source = payload.get("source")
+        index.doc_ids = payload["doc_ids"]
+        index.doc_lens = payload["doc_lens"]
+        index.postings = payload["postings"]
+        index._reindex_docs()
+        return index
+
+    def save(self, path):
+        # Several workers may rebuild at once; never leave a half-written file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def load_or_build(pages, index_path, cache_path):
+    """Load the serialized search index if it matches index_path, else rebuild it.
+
+    pages may be a callable returning the pages, so they are only
+    assembled when a rebuild is needed.
+    """
+    source = file_fingerprint(index_path) if os.path.exists(index_path) else None
+    if source and os.path.exists(cache_path):
+        try:
+            cached = SearchIndex.load(cache_path)
+            if cached.source == source:
+                return cached
+        except (OSError, ValueError, KeyError):
+            pass
+    index = SearchIndex.build(pages() if callable(pages) else pages)
+    index.source = source
+    if source:
+        try:
+            index.save(cache_path)
+        except OSError as e:
+            print(f"⚠️ Could not save search index: {e}")
+    return index
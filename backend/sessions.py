@@ -0,0 +1,125 @@
+import json
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+SESSION_COOKIE = "slt_session"
+SESSION_HEADER = "X-Session-ID"
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+HTML_TAG = re.compile(r"<[^>]+>")
+SESSION_TTL = 30 * 60       # seconds of inactivity before a session expires
+MAX_HISTORY = 6             # messages kept per session (user + bot)
+MAX_TURN_CHARS = 500        # each message is trimmed to this for the prompt
+
+
+def new_session():
+    return {"state": None, "history": []}
+
+
+def session_id_from_request(req):
+    """Return the caller's session ID, or a fresh one if missing or malformed."""
+    session_id = req.headers.get(SESSION_HEADER) or req.cookies.get(SESSION_COOKIE)
+    if session_id and SESSION_ID_PATTERN.match(session_id):
+        return session_id
+    return secrets.token_urlsafe(18)
+
+
+def add_turn(session, role, text, max_history=MAX_HISTORY):
+    # Replies may already carry link HTML; the prompt only needs the text
+    text = HTML_TAG.sub("", text)[:MAX_TURN_CHARS]
+    session["history"].append({"role": role, "text": text})
+    del session["history"][:-max_history]
+
+
+# -------------------------------
+# 🧠 In-process Store
+# -------------------------------
+
+
+class MemorySessionStore:
+    """LRU + TTL session store local to one worker process."""
+
+    def __init__(self, max_sessions=10000, ttl=SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()   # id -> (session, last used)
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or time.time() - entry[1] > self.ttl:
+                self._sessions.pop(session_id, None)
+                return new_session()
+            self._sessions.move_to_end(session_id)
+            return json.loads(entry[0])
+
+    def save(self, session_id, session):
+        now = time.time()
+        with self._lock:
+            # Stored serialized so callers can't mutate shared state
+            self._sessions[session_id] = (json.dumps(session), now)
+            self._sessions.move_to_end(session_id)
+            # Least recently used first, so expired sessions sit at the front
+            while self._sessions:
+                oldest_id, (_, used) = next(iter(self._sessions.items()))
+                if len(self._sessions) <= self.max_sessions and now - used <= self.ttl:
+                    break
+                del self._sessions[oldest_id]
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+# -------------------------------
+# 🗄️ Shared SQLite Store
+# -------------------------------
+
+
+class SQLiteSessionStore:
+    """Session store in a SQLite file, shared by every worker on the host."""
+
+    def __init__(self, path, ttl=SESSION_TTL, purge_every=200):
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions "
+            "(id TEXT PRIMARY KEY, data TEXT, updated REAL)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+
+    def get(self, session_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM sessions WHERE id = ? AND updated > ?",
+                (session_id, time.time() - self.ttl)).fetchone()
+        return json.loads(row[0]) if row else new_session()
+
+    def save(self, session_id, session):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                (session_id, json.dumps(session, ensure_ascii=False), time.time()))
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._db.execute("DELETE FROM sessions WHERE updated <= ?",
+                                 (time.time() - self.ttl,))
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_store(backend, sqlite_path="data/sessions.sqlite3"):
+    if backend == "sqlite":
+        return SQLiteSessionStore(sqlite_path)
+    if backend == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"Unknown session backend: {backend}")
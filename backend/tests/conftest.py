@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules are flat scripts that import each other by name and
+# open data/... relative to the backend folder, as when run from there.
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.chdir(BACKEND)
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Point app.py at the load-test stub Ollama with a fresh answer cache."""
+    # Imported here, after the sys.path setup above
+    import app
+    from answer_cache import AnswerCache
+    from loadtest import StubOllama, serve_in_thread
+
+    server = serve_in_thread(StubOllama(first_token_delay=0, token_delay=0))
+    monkeypatch.setattr(app.ollama_client, "url", server.url)
+    monkeypatch.setattr(app, "ANSWER_CACHE", AnswerCache(source_path=app.INDEX_PATH))
+    monkeypatch.setattr(app, "NOMINATIM_FALLBACK", False)
+    yield server
+    server.shutdown()
+    server.server_close()
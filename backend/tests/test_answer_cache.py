@@ -0,0 +1,81 @@
+"""AnswerCache eviction, expiry and SQLite persistence."""
+import pytest
+
+import answer_cache
+from answer_cache import AnswerCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "index.json"
+    path.write_text("{}")
+    return path
+
+
+def test_lru_eviction(clock):
+    cache = AnswerCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"        # "b" is now least recently used
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+
+
+def test_ttl_expiry(clock, tmp_path):
+    db = str(tmp_path / "answers.sqlite3")
+    cache = AnswerCache(ttl=60, db_path=db)
+    cache.put("a", "A", gen_seconds=2.0)
+    clock.now += 59
+    assert cache.get("a") == "A"
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1, "hit_rate": 0.5,
+                             "saved_generation_seconds": 2.0}
+    # Expired entries are deleted from SQLite too
+    assert AnswerCache(ttl=3600, db_path=db).stats()["entries"] == 0
+
+
+def test_reload_from_sqlite(clock, tmp_path, source):
+    db = str(tmp_path / "answers.sqlite3")
+    first = AnswerCache(max_entries=2, db_path=db, source_path=str(source))
+    for key in ("a", "b", "c"):
+        first.put(key, key.upper())
+        clock.now += 1
+
+    second = AnswerCache(max_entries=2, db_path=db, source_path=str(source))
+    assert second.stats()["entries"] == 2
+    assert (second.get("a"), second.get("b"), second.get("c")) == (None, "B", "C")
+
+
+def test_source_change_clears_cache(clock, tmp_path, source):
+    db = str(tmp_path / "answers.sqlite3")
+    cache = AnswerCache(db_path=db, source_path=str(source))
+    cache.put("a", "A")
+
+    source.write_text('{"new": "pages"}')
+    assert AnswerCache(db_path=db, source_path=str(source)).get("a") is None
+    assert cache.get("a") is None
+
+
+def test_write_failure_keeps_memory_entry(clock, tmp_path, capsys):
+    cache = AnswerCache(db_path=str(tmp_path / "answers.sqlite3"))
+    cache._db.close()   # every write now raises sqlite3.ProgrammingError
+    cache.put("a", "A")
+    assert cache.get("a") == "A"
+    assert "Answer cache write failed" in capsys.readouterr().out
@@ -0,0 +1,48 @@
+"""/chat and /chat/stream against the load-test stub Ollama server."""
+
+import app
+
+
+def chat(client, message):
+    res = client.post("/chat", json={"message": message})
+    assert res.status_code == 200
+    return res.json
+
+
+def test_canned_turns_do_not_split_the_answer_cache(stub):
+    first = app.app.test_client()
+    chat(first, "hi")
+    chat(first, "kandy branch phone number")
+    chat(first, "what are the fibre packages")
+    assert app.ANSWER_CACHE.stats()["misses"] == 1
+
+    # A new conversation asking the same question shares the entry
+    chat(app.app.test_client(), "what are the fibre packages")
+    assert app.ANSWER_CACHE.stats()["hits"] == 1
+
+
+def test_history_holds_only_qa_turns(stub):
+    client = app.app.test_client()
+    chat(client, "hello")
+    chat(client, "what are the fibre packages")
+    session_id = client.post("/chat", json={"message": "thanks"}).headers[app.SESSION_HEADER]
+    history = app.SESSION_STORE.get(session_id)["history"]
+    assert [turn["role"] for turn in history] == ["user", "assistant"]
+    assert history[0]["text"] == "what are the fibre packages"
+
+
+def test_history_counts_against_the_prompt_budget(stub, monkeypatch):
+    question = "what are the fibre packages"
+    long_history = [{"role": role, "text": f"{role} turn {i} " + "x" * 480}
+                    for i, role in enumerate(["user", "assistant"] * 3)]
+
+    monkeypatch.setattr(app, "PROMPT_TOKEN_BUDGET", 0)
+    _, template, _ = app.prepare_reply(question, {"state": None, "history": long_history})
+    assert "Recent Conversation" not in template
+
+    monkeypatch.setattr(app, "PROMPT_TOKEN_BUDGET", 700)
+    _, prompt, _ = app.prepare_reply(question, {"state": None, "history": long_history})
+    assert "Recent Conversation" in prompt and "turn 5" in prompt
+    assert "turn 0" not in prompt      # oldest turns are dropped first
+    # Rounding each part up to whole tokens costs at most a few tokens
+    assert app.estimate_tokens(prompt) <= app.estimate_tokens(template) + 700 + 3
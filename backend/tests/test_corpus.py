@@ -0,0 +1,44 @@
+"""The memory-mapped page store written by scraper.py."""
+import pytest
+
+from corpus import Corpus, write_corpus
+
+PAGES = {
+    "https://www.slt.lk/en/fibre": {"title": "Fibre", "text": "Fibre packages. Menu",
+                                    "ocr_images": [{"src": "a.png", "text": "Menu"}],
+                                    "passages": ["Fibre packages."]},
+    "https://www.slt.lk/en/empty": {"title": "Empty", "text": "Menu", "ocr_images": [],
+                                    "passages": []},
+    "https://www.slt.lk/en/old": {"title": "Old", "text": "Index without passages"},
+}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = str(tmp_path / "corpus.bin")
+    write_corpus(path, PAGES)
+    corpus = Corpus(path)
+    yield corpus
+    corpus.close()
+
+
+def test_pages_with_passages_drop_the_folded_text(corpus):
+    assert list(corpus) == list(PAGES)
+    assert corpus["https://www.slt.lk/en/fibre"] == {"title": "Fibre", "passages": ["Fibre packages."]}
+    # Without passages the app chunks "text" itself, so it is kept
+    assert corpus["https://www.slt.lk/en/empty"] == PAGES["https://www.slt.lk/en/empty"]
+    assert corpus["https://www.slt.lk/en/old"] == PAGES["https://www.slt.lk/en/old"]
+
+
+def test_writes_go_to_the_overlay(corpus):
+    new = {"title": "New", "passages": ["New page."]}
+    corpus["https://www.slt.lk/en/new"] = new
+    del corpus["https://www.slt.lk/en/old"]
+    corpus["https://www.slt.lk/en/fibre"] = new
+    assert len(corpus) == 3
+    assert "https://www.slt.lk/en/old" not in corpus
+    assert corpus["https://www.slt.lk/en/fibre"] == new
+    assert list(corpus) == ["https://www.slt.lk/en/fibre", "https://www.slt.lk/en/empty",
+                            "https://www.slt.lk/en/new"]
+    with pytest.raises(KeyError):
+        corpus["https://www.slt.lk/en/old"]
@@ -0,0 +1,59 @@
+"""Offline place lookup and nearest-branch search."""
+import json
+
+import pytest
+from geopy.distance import geodesic
+
+from geo import BranchLocator, Gazetteer
+
+
+@pytest.fixture(scope="module")
+def branches():
+    with open("data/branches.json", encoding="utf8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return Gazetteer.load("data/gazetteer.json", "data/branches.json")
+
+
+@pytest.mark.parametrize("text, name", [
+    ("kandy", "Kandy"),
+    ("Kandy branch phone number", "Kandy"),
+    ("kandyy", "Kandy"),                        # typo
+    ("kandanaa or kandy", "Kandy"),             # exact beats an earlier fuzzy match
+    ("nuwara eliya address", "Nuwara Eliya"),
+    ("nuwaraeliya", "Nuwara Eliya"),
+    ("Ja-Ela", "Ja-Ela"),
+    ("ja ela", "Ja-Ela"),
+    ("jaela office", "Ja-Ela"),
+    ("migamuwa", "Negombo"),                    # alias
+    ("colombo fort contact", "Colombo Fort"),   # longer name beats "colombo"
+])
+def test_resolve(gazetteer, text, name):
+    assert gazetteer.resolve(text)["name"] == name
+
+
+@pytest.mark.parametrize("text", [
+    "", "near me", "what are the fibre packages", "how do i pay my bill",
+    "is there an office", "peo tv channels", "thank you",
+])
+def test_generic_words_match_nothing(gazetteer, text):
+    assert gazetteer.resolve(text) is None
+
+
+@pytest.mark.parametrize("point", [
+    (6.9271, 79.8612), (7.2906, 80.6337), (9.6615, 80.0255), (5.9549, 80.555), (8.3114, 80.4037),
+])
+def test_nearest_matches_geodesic_order(branches, point):
+    reference = sorted((geodesic(point, (b["latitude"], b["longitude"])).km, b["name"])
+                       for b in branches)[:5]
+    found = BranchLocator(branches).nearest(point, top_n=5)
+    assert [b["name"] for b, _ in found] == [name for _, name in reference]
+    for (_, km), (expected, _) in zip(found, reference):
+        assert km == pytest.approx(expected, rel=0.01, abs=0.05)
+
+
+def test_nearest_with_no_branches():
+    assert BranchLocator([]).nearest((6.9, 79.9)) == []
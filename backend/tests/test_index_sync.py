@@ -0,0 +1,63 @@
+"""Workers pick up scraper.py deltas from disk without a restart."""
+import json
+import time
+
+import pytest
+
+import app
+from scraper import archive_delta
+
+
+@pytest.fixture
+def delta_file(tmp_path, monkeypatch):
+    path = tmp_path / "index_delta.json"
+    monkeypatch.setattr(app, "DELTA_PATH", str(path))
+    monkeypatch.setattr(app, "DELTA_DIR", str(tmp_path / "deltas"))
+    monkeypatch.setattr(app, "INDEX_VERSION", None)
+    monkeypatch.setattr(app, "_delta_mtime", None)
+    monkeypatch.setattr(app, "_next_delta_check", time.monotonic() + 60)
+    yield path
+    app.reload_index()
+
+
+def write_delta(path, created, base, added=None, removed=()):
+    delta = {"created": created, "base": base, "added": added or {},
+             "changed": {}, "removed": list(removed)}
+    archive_delta(delta, folder=str(path.parent / "deltas"))
+    path.write_text(json.dumps(delta))
+
+
+def test_new_delta_is_applied_in_place(delta_file):
+    url = "https://www.slt.lk/en/test-zebraquux"
+    write_delta(delta_file, 1.0, None,
+                added={url: {"title": "t", "text": "zebraquux offer", "passages": ["zebraquux offer"]}})
+    assert app.sync_index_delta() is None          # checked too recently
+    assert app.sync_index_delta(force=True) == {"added": 1, "changed": 0, "removed": 0}
+    assert app.INDEX_VERSION == 1.0
+    assert app.find_relevant_passages("zebraquux")[0][1] == url
+    assert app.sync_index_delta(force=True) is None  # same file, nothing new
+
+
+def test_missed_deltas_are_replayed_in_order(delta_file):
+    index = app.INDEX
+    url = "https://www.slt.lk/en/test-zebraquux"
+    write_delta(delta_file, 1.0, None,
+                added={url: {"title": "t", "text": "zebraquux offer", "passages": ["zebraquux offer"]}})
+    write_delta(delta_file, 2.0, 1.0, removed=[url])
+    write_delta(delta_file, 3.0, 2.0,
+                added={url: {"title": "t", "text": "quuxzebra deal", "passages": ["quuxzebra deal"]}})
+    # An idle worker never saw 1.0 or 2.0; it applies all three in place
+    assert app.sync_index_delta(force=True) == {"added": 2, "changed": 0, "removed": 1}
+    assert app.INDEX is index
+    assert app.INDEX_VERSION == 3.0
+    assert app.find_relevant_passages("zebraquux") == []
+    assert app.find_relevant_passages("quuxzebra")[0][1] == url
+
+
+def test_pruned_delta_reloads_from_disk(delta_file):
+    index, pages = app.INDEX, len(app.INDEX)
+    write_delta(delta_file, 2.0, base=1.5, removed=[next(iter(index))])
+    assert app.sync_index_delta(force=True) == {"reloaded": True}
+    assert app.INDEX is not index
+    assert len(app.INDEX) == pages
+    assert app.INDEX_VERSION == 2.0
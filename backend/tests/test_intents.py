@@ -0,0 +1,28 @@
+"""The compiled intent router classifies like the old /chat rule cascade."""
+import json
+
+import pytest
+
+from bench_router import MESSAGES, new_route, old_cascade
+from intents import IntentRouter
+
+
+@pytest.fixture(scope="module")
+def branches():
+    with open("data/branches.json", encoding="utf8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def router(branches):
+    return IntentRouter.load("data/intents.json", branches)
+
+
+@pytest.mark.parametrize("message", MESSAGES)
+def test_router_agrees_with_old_cascade(router, branches, message):
+    message = message.strip().lower()
+    assert new_route(router, message) == old_cascade(message, branches)
+
+
+def test_router_normalizes_case_and_whitespace(router):
+    assert router.route("  Kandy Branch PHONE number ") == router.route("kandy branch phone number")
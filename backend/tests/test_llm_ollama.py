@@ -0,0 +1,121 @@
+"""OllamaClient and AsyncOllamaClient against the load-test stub Ollama server."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_ollama import AsyncOllamaClient, OllamaClient
+from loadtest import STUB_ANSWER, StubOllama, serve_in_thread
+
+ANSWER = "".join(word + " " for word in STUB_ANSWER.split())
+
+
+@pytest.fixture
+def ollama():
+    servers = []
+
+    def start(first_token_delay=0.0):
+        server = serve_in_thread(StubOllama(first_token_delay, token_delay=0))
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def run_threads(target, args_list):
+    results = [None] * len(args_list)
+
+    def run(i, args):
+        try:
+            results[i] = target(*args)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i, args)) for i, args in enumerate(args_list)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_identical_prompts_are_coalesced(ollama):
+    client = OllamaClient(ollama(first_token_delay=0.3).url)
+    assert run_threads(client.generate, [("same prompt",)] * 4) == [ANSWER] * 4
+    stats = client.metrics()
+    assert (stats["requests"], stats["coalesced"]) == (1, 3)
+    assert client.generate("same prompt") == ANSWER     # done calls aren't shared
+    assert client.metrics()["requests"] == 2
+
+
+def test_max_concurrent_caps_generations(ollama):
+    client = OllamaClient(ollama(first_token_delay=0.2).url, max_concurrent=2)
+    peak, done = [0], threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], client.metrics()["in_flight"])
+            time.sleep(0.005)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    start = time.monotonic()
+    assert run_threads(client.generate, [(f"prompt {i}",) for i in range(4)]) == [ANSWER] * 4
+    elapsed = time.monotonic() - start
+    done.set()
+    sampler.join()
+    # Four 200 ms generations, two at a time
+    assert elapsed >= 0.39
+    assert peak[0] == 2
+    assert client.metrics()["wait_seconds_max"] >= 0.15
+
+
+def test_queue_timeout_rejects(ollama):
+    client = OllamaClient(ollama(first_token_delay=0.3).url, max_concurrent=1,
+                          queue_timeout=0.05)
+    busy = threading.Thread(target=client.generate, args=("slow",))
+    busy.start()
+    time.sleep(0.05)
+    with pytest.raises(TimeoutError):
+        client.generate("other")
+    busy.join()
+    stats = client.metrics()
+    assert (stats["requests"], stats["rejected"], stats["in_flight"]) == (2, 1, 0)
+
+
+def test_async_generate_and_stream(ollama):
+    client = AsyncOllamaClient(OllamaClient(ollama().url))
+
+    async def main():
+        answers = await asyncio.gather(*[client.generate("same prompt") for _ in range(3)])
+        chunks = [chunk async for chunk in client.stream("stream prompt")]
+        return answers, chunks
+
+    answers, chunks = asyncio.run(main())
+    assert answers == [ANSWER] * 3
+    assert chunks == [word + " " for word in STUB_ANSWER.split()]
+    stats = client.metrics()
+    assert (stats["requests"], stats["coalesced"], stats["in_flight"]) == (2, 2, 0)
+
+
+def test_async_client_shares_the_sync_limit(ollama):
+    sync = OllamaClient(ollama(first_token_delay=0.3).url, max_concurrent=1,
+                        queue_timeout=0.05)
+    client = AsyncOllamaClient(sync)
+    busy = threading.Thread(target=sync.generate, args=("slow",))
+    busy.start()
+    time.sleep(0.05)
+
+    async def stream():
+        return [chunk async for chunk in client.stream("other")]
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(client.generate("other"))
+    with pytest.raises(TimeoutError):
+        asyncio.run(stream())
+    busy.join()
+    assert sync.metrics()["rejected"] == 2
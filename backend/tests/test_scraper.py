@@ -0,0 +1,269 @@
+"""Crawler tests against a local http.server fixture site standing in for slt.lk."""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import scraper
+from scraper import Crawler, HostThrottle
+
+IMAGE_BYTES = b"\x89PNG" + b"\0" * scraper.MIN_IMAGE_BYTES
+
+
+def fake_ocr(content):
+    # Runs in the forked OCR processes; count calls in a file the test reads
+    with open(os.environ["SLT_TEST_OCR_LOG"], "a") as f:
+        f.write("ocr\n")
+    return f"ocr text {len(content)}"
+
+
+class FixtureSite(ThreadingHTTPServer):
+    """Serves {path: html or bytes} and logs (path, time) for each GET.
+
+    A route may also be (status, body) to answer with another HTTP status.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, routes, delays=None):
+        self.routes = routes
+        self.delays = delays or {}
+        self.log = []
+        super().__init__(("127.0.0.1", 0), FixtureHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def paths(self):
+        return [path for path, _ in self.log]
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.log.append((self.path, time.monotonic()))
+        time.sleep(self.server.delays.get(self.path, 0))
+        body = self.server.routes.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        status = 200
+        if isinstance(body, tuple):
+            status, body = body
+        is_html = isinstance(body, str)
+        body = body.encode() if is_html else body
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html" if is_html else "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def page(title, links=(), images=()):
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    imgs = "".join(f'<img src="{src}">' for src in images)
+    return f"<html><head><title>{title}</title></head><body><p>{title} body</p>{anchors}{imgs}</body></html>"
+
+
+@pytest.fixture
+def ocr_log(tmp_path, monkeypatch):
+    path = tmp_path / "ocr.log"
+    path.write_text("")
+    monkeypatch.setenv("SLT_TEST_OCR_LOG", str(path))
+    monkeypatch.setattr(scraper, "ocr_image_bytes", fake_ocr)
+    return path
+
+
+@pytest.fixture
+def site():
+    servers = []
+
+    def start(routes, delays=None):
+        server = FixtureSite(routes, delays)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def crawler(site, tmp_path, **kwargs):
+    options = {"fetch_workers": 1, "ocr_workers": 1, "host_delay": 0,
+               "checkpoint_path": str(tmp_path / "checkpoint.json")}
+    options.update(kwargs)
+    return Crawler(site.base_url, **options)
+
+
+def test_bfs_order_and_depth(site, tmp_path, ocr_log):
+    server = site({
+        "/": page("home", ["/a", "/b"]),
+        "/a": page("a", ["/c", "/"]),
+        "/b": page("b", ["/c"]),
+        "/c": page("c", ["/d"]),
+        "/d": page("d"),
+    })
+    c = crawler(server, tmp_path, max_depth=2)
+    assert c.run()
+    assert server.paths() == ["/", "/a", "/b", "/c"]
+    assert set(c.data) == {server.base_url + p for p in ("", "/a", "/b", "/c")}
+    assert not os.path.exists(tmp_path / "checkpoint.json")
+
+
+def test_host_throttle_spaces_requests():
+    throttle = HostThrottle(0.05)
+    times = []
+
+    def hit():
+        throttle.wait("http://example.test/page")
+        times.append(time.monotonic())
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=hit) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Four calls get slots 0, 50, 100 and 150 ms after the first
+    assert max(times) - start >= 0.145
+    assert min(times) - start < 0.05
+
+
+def test_crawl_respects_host_delay(site, tmp_path, ocr_log):
+    server = site({"/": page("home", [f"/p{i}" for i in range(6)]),
+                   **{f"/p{i}": page(f"p{i}") for i in range(6)}})
+    c = crawler(server, tmp_path, fetch_workers=4, host_delay=0.05)
+    assert c.run()
+    starts = sorted(t for _, t in server.log)
+    assert len(starts) == 7
+    # Four workers, yet seven requests to one host take at least 6 x 50 ms
+    assert starts[-1] - starts[0] >= 0.28
+
+
+def test_images_deduped_by_url_and_content_hash(site, tmp_path, ocr_log):
+    server = site({
+        "/": page("home", ["/a", "/b"], ["/img/logo.png"]),
+        "/a": page("a", [], ["/img/logo.png", "/img/copy.png"]),
+        "/b": page("b", [], ["/img/logo.png"]),
+        "/img/logo.png": IMAGE_BYTES,
+        "/img/copy.png": IMAGE_BYTES,
+    })
+    c = crawler(server, tmp_path, fetch_workers=3)
+    assert c.run()
+
+    paths = server.paths()
+    assert paths.count("/img/logo.png") == 1          # same URL: one download
+    assert paths.count("/img/copy.png") == 1
+    assert ocr_log.read_text().count("ocr") == 1       # same bytes: one OCR
+    texts = {img["text"] for data in c.data.values() for img in data["ocr_images"]}
+    assert texts == {f"ocr text {len(IMAGE_BYTES)}"}
+
+
+def test_resume_from_checkpoint(site, tmp_path, ocr_log):
+    server = site({
+        "/": page("home", ["/a", "/b", "/c"]),
+        "/a": page("a", ["/d"]),
+        "/b": page("b"),
+        "/c": page("c"),
+        "/d": page("d"),
+    }, delays={"/a": 0.3})
+
+    first = crawler(server, tmp_path, time_budget=0.1)
+    assert not first.run()
+    assert server.paths() == ["/", "/a"]
+    assert os.path.exists(tmp_path / "checkpoint.json")
+
+    second = crawler(server, tmp_path)
+    assert second.load_checkpoint()
+    assert second.run()
+    # Nothing already crawled is fetched again
+    assert server.paths() == ["/", "/a", "/b", "/c", "/d"]
+    assert set(second.data) == {server.base_url + p for p in ("", "/a", "/b", "/c", "/d")}
+    assert not os.path.exists(tmp_path / "checkpoint.json")
+
+
+def test_checkpoint_while_workers_write(site, tmp_path, ocr_log, monkeypatch):
+    # Checkpoint after every page while workers are still adding
+    # validators and OCR results
+    monkeypatch.setattr(scraper, "CHECKPOINT_EVERY", 1)
+    routes = {"/": page("home", [f"/p{i}" for i in range(40)])}
+    for i in range(40):
+        routes[f"/p{i}"] = page(f"p{i}", [], [f"/img/{i}.png", f"/img/{i + 1}.png"])
+        routes[f"/img/{i}.png"] = IMAGE_BYTES + bytes([i])
+    routes["/img/40.png"] = IMAGE_BYTES
+    server = site(routes)
+
+    c = crawler(server, tmp_path, fetch_workers=8)
+    assert c.run()
+    assert len(c.data) == 41
+    assert len(c.hash_results) == 41
+
+
+def test_markup_only_change_is_not_a_change(site, tmp_path, ocr_log):
+    server = site({"/": page("home")})
+    first = crawler(server, tmp_path)
+    assert first.run()
+    previous = {url: {**data, "passages": ["home body"]} for url, data in first.data.items()}
+
+    server.routes["/"] = page("home").replace("<body>", '<body data-nonce="42">')
+    second = crawler(server, tmp_path, previous=previous,
+                     validators=first.validators, incremental=True)
+    assert second.run()
+    assert second.changed == set()
+    assert second.data == previous
+    delta = second.build_delta(True)
+    assert (delta["added"], delta["changed"], delta["removed"]) == ({}, {}, [])
+
+
+@pytest.mark.parametrize("status", [403, 429, 500, 503])
+def test_error_status_keeps_last_good_copy(site, tmp_path, ocr_log, status):
+    server = site({"/": page("home", ["/a"]), "/a": page("a")})
+    first = crawler(server, tmp_path)
+    assert first.run()
+
+    server.routes["/a"] = (status, "Service Unavailable")
+    second = crawler(server, tmp_path, previous=first.data,
+                     validators=first.validators, incremental=True)
+    assert second.run()
+    a = server.base_url + "/a"
+    assert second.data[a] == first.data[a]
+    delta = second.build_delta(True)
+    assert a not in delta["changed"] and a not in delta["removed"]
+
+
+def test_ocr_results_reused_across_runs(site, tmp_path, ocr_log):
+    server = site({"/": page("home", [], ["/img/logo.png"]), "/img/logo.png": IMAGE_BYTES})
+    first = crawler(server, tmp_path)
+    assert first.run()
+    assert ocr_log.read_text().count("ocr") == 1
+
+    # A real edit means the page is parsed again and its image re-downloaded,
+    # but the image bytes match the saved hash, so it is not OCR'd again
+    server.routes["/"] = page("home page", [], ["/img/logo.png"])
+    second = crawler(server, tmp_path, previous=first.data, validators=first.validators,
+                     incremental=True, ocr_cache=first.ocr_cache)
+    assert second.run()
+    assert second.changed == {server.base_url}
+    assert ocr_log.read_text().count("ocr") == 1
+    assert second.data[server.base_url]["ocr_images"] == first.data[server.base_url]["ocr_images"]
+
+    server.routes["/img/logo.png"] = IMAGE_BYTES + b"new"
+    third = crawler(server, tmp_path, ocr_cache=second.ocr_cache)
+    assert third.run()
+    assert ocr_log.read_text().count("ocr") == 2
+
+
+def test_archive_keeps_latest_deltas(tmp_path):
+    folder = tmp_path / "deltas"
+    for i in range(4):
+        scraper.archive_delta({"created": 1.5 + i, "base": None}, folder=str(folder), keep=2)
+        os.utime(folder / f"index_delta.{1.5 + i!r}.json", (i, i))
+    assert sorted(os.listdir(folder)) == ["index_delta.3.5.json", "index_delta.4.5.json"]
@@ -0,0 +1,94 @@
+import math
+import os
+
+import pytest
+
+from search import SearchIndex, load_or_build, tokenize
+
+PAGES = {"https://www.slt.lk/a": {"text": "fibre packages"},
+         "https://www.slt.lk/b": {"text": "peo tv channels"}}
+
+
+def test_load_or_build_reuses_cache_until_source_changes(tmp_path):
+    source, cache = tmp_path / "corpus.bin", str(tmp_path / "index.json")
+    source.write_bytes(b"v1")
+    built = []
+
+    def pages():
+        built.append(1)
+        return PAGES
+
+    first = load_or_build(pages, str(source), cache)
+    second = load_or_build(pages, str(source), cache)
+    assert len(built) == 1
+    assert second.search("fibre")[0][1] == "https://www.slt.lk/a"
+    assert isinstance(first, SearchIndex)
+
+    source.write_bytes(b"v22")
+    load_or_build(pages, str(source), cache)
+    assert len(built) == 2
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+@pytest.mark.parametrize("text, tokens", [
+    ("What are the Fibre packages?", ["fibre", "package"]),
+    ("PackagesMegaline PeoTV", ["package", "megaline", "peo", "tv"]),
+    ("Access address class", ["access", "address", "class"]),   # -ss isn't a plural
+    ("bus gas 4G", ["bus", "gas", "4g"]),                       # too short to fold
+    ("", []),
+])
+def test_tokenize(text, tokens):
+    assert tokenize(text) == tokens
+
+
+def test_bm25_ranking():
+    index = SearchIndex.build({
+        "once": {"text": "fibre broadband router"},
+        "twice": {"text": "fibre fibre broadband router"},
+        "long": {"text": "fibre broadband router " + "modem " * 20},
+        "other": {"text": "peo tv channels"},
+    })
+    ranked = [url for _, url in index.search("fibre", top_n=4)]
+    # Higher term frequency ranks first, longer documents are penalized,
+    # and pages without the term are not returned at all
+    assert ranked == ["twice", "once", "long"]
+
+    # "peo" is in one page of four, "fibre" in three, so it is worth more
+    (score, url), = index.search("peo", top_n=1)
+    n, df, tf, avg = 4, 1, 1, index.avg_doc_len
+    norm = index.k1 * (1 - index.b + index.b * index.doc_lens[3] / avg)
+    idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+    assert url == "other"
+    assert score == pytest.approx(idf * tf * (index.k1 + 1) / (tf + norm))
+    assert score > index.search("fibre", top_n=1)[0][0]
+
+
+def assert_same_index(index, pages):
+    fresh = SearchIndex.build(pages)
+    assert index.total_len == sum(index.doc_lens) == fresh.total_len
+    assert len(index.doc_numbers) == len(pages)
+    assert index.avg_doc_len == fresh.avg_doc_len
+    for query in ("fibre", "peo tv", "prepaid data package"):
+        assert index.search(query, 5) == pytest.approx(fresh.search(query, 5))
+
+
+def test_add_and_remove_keep_lengths_consistent():
+    pages = dict(PAGES)
+    index = SearchIndex.build(pages)
+    new = {"text": "prepaid data packages for fibre users"}
+    index.add_page("https://www.slt.lk/c", new)
+    pages["https://www.slt.lk/c"] = new
+    assert_same_index(index, pages)
+
+    index.remove_page("https://www.slt.lk/a", pages.pop("https://www.slt.lk/a"))
+    index.remove_page("https://www.slt.lk/missing", {"text": "fibre"})   # ignored
+    assert_same_index(index, pages)
+    assert "fibre" in index.postings and "package" in index.postings
+
+    # A changed page is removed with its old content and added again
+    changed = {"text": "peo tv channels and packages"}
+    index.remove_page("https://www.slt.lk/b", pages["https://www.slt.lk/b"])
+    index.add_page("https://www.slt.lk/b", changed)
+    pages["https://www.slt.lk/b"] = changed
+    assert_same_index(index, pages)
+    assert_same_index(SearchIndex.from_dict(index.to_dict()), pages)
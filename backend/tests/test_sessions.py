@@ -0,0 +1,101 @@
+"""Memory and SQLite session stores, and session ID handling."""
+from types import SimpleNamespace
+
+import pytest
+
+import sessions
+from sessions import (SESSION_COOKIE, SESSION_HEADER, SESSION_ID_PATTERN,
+                      MemorySessionStore, SQLiteSessionStore, add_turn,
+                      session_id_from_request)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions, "time", clock)
+    return clock
+
+
+def session(*texts):
+    data = sessions.new_session()
+    for text in texts:
+        add_turn(data, "user", text)
+    return data
+
+
+def test_sqlite_stores_share_one_file(clock, tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first, second = SQLiteSessionStore(path), SQLiteSessionStore(path)
+    first.save("a" * 16, session("hi"))
+    assert second.get("a" * 16) == session("hi")
+    second.save("a" * 16, session("hi", "kandy"))
+    assert first.get("a" * 16) == session("hi", "kandy")
+    assert len(first) == len(second) == 1
+
+
+def test_sqlite_ttl_and_purge(clock, tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), ttl=60, purge_every=3)
+    store.save("old", session("hi"))
+    clock.now += 61
+    assert store.get("old") == sessions.new_session()
+    assert len(store) == 1              # expired, but not purged yet
+    store.save("new1", session("hi"))
+    store.save("new2", session("hi"))   # third write purges
+    assert len(store) == 2
+    assert store.get("new1") == session("hi")
+
+
+def test_memory_ttl_expiry(clock):
+    store = MemorySessionStore(ttl=60)
+    store.save("a", session("hi"))
+    clock.now += 59
+    assert store.get("a") == session("hi")
+    clock.now += 61
+    assert store.get("a") == sessions.new_session()
+    assert len(store) == 0
+
+
+def test_memory_lru_eviction(clock):
+    store = MemorySessionStore(max_sessions=2)
+    store.save("a", session("a"))
+    store.save("b", session("b"))
+    store.get("a")                      # "b" is now least recently used
+    store.save("c", session("c"))
+    assert len(store) == 2
+    assert store.get("b") == sessions.new_session()
+    assert store.get("a") == session("a")
+
+
+def test_memory_store_returns_copies(clock):
+    store = MemorySessionStore()
+    store.save("a", session("hi"))
+    store.get("a")["history"].clear()
+    assert store.get("a") == session("hi")
+
+
+def request(header=None, cookie=None):
+    return SimpleNamespace(headers={SESSION_HEADER: header} if header else {},
+                           cookies={SESSION_COOKIE: cookie} if cookie else {})
+
+
+@pytest.mark.parametrize("session_id", [
+    "short", "x" * 65, "has space in the id!", "../../etc/passwd-000", "<script>alert(1)</script>"])
+def test_malformed_session_ids_are_replaced(session_id):
+    for req in (request(header=session_id), request(cookie=session_id)):
+        fresh = session_id_from_request(req)
+        assert fresh != session_id
+        assert SESSION_ID_PATTERN.match(fresh)
+
+
+def test_valid_session_id_is_kept():
+    assert session_id_from_request(request(header="a" * 16, cookie="b" * 16)) == "a" * 16
+    assert session_id_from_request(request(cookie="b" * 16)) == "b" * 16
+    assert session_id_from_request(request()) != session_id_from_request(request())
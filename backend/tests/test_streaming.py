@@ -0,0 +1,83 @@
+"""Incremental link conversion and the /chat/stream event sequence."""
+import json
+
+import pytest
+
+import app
+from app import convert_links_stream, convert_links_to_html
+from loadtest import STUB_ANSWER
+
+TEXT = ("See https://www.slt.lk/en/personal/broadband/ftth for fibre, "
+        "or (https://www.slt.lk/en/peo-tv) and https://www.slt.lk.")
+
+
+def split_every(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 11, 40, len(TEXT)])
+def test_stream_conversion_matches_whole_text(size):
+    chunks = split_every(TEXT, size)
+    assert "".join(convert_links_stream(chunks)) == convert_links_to_html(TEXT)
+
+
+def test_url_split_across_chunks_stays_one_link():
+    chunks = ["Visit https://www.s", "lt.lk/en/bro", "adband", " today"]
+    out = list(convert_links_stream(chunks))
+    assert "".join(out) == convert_links_to_html("".join(chunks))
+    assert sum(part.count("<a href") for part in out) == 1
+    assert 'href="https://www.slt.lk/en/broadband"' in "".join(out)
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def stream(message, headers=None):
+    res = app.app.test_client().post("/chat/stream", json={"message": message},
+                                     headers=headers or {})
+    assert res.status_code == 200
+    assert res.mimetype == "text/event-stream"
+    return parse_events(res.get_data(as_text=True))
+
+
+def test_llm_answer_streams_tokens_then_done(stub):
+    events = stream("what are the fibre packages")
+    kinds = [kind for kind, _ in events]
+    assert kinds[-1] == "done" and set(kinds[:-1]) == {"token"} and len(kinds) > 2
+    text = "".join(data["text"] for kind, data in events if kind == "token")
+    expected = " ".join(STUB_ANSWER.split()) + " "
+    assert text == convert_links_to_html(expected)
+    assert events[-1][1]["prompt_tokens"] > 0
+
+
+def test_canned_reply_is_one_token_then_done(stub):
+    assert [kind for kind, _ in stream("hello")] == ["token", "done"]
+
+
+def test_upstream_failure_ends_with_error_event(stub, monkeypatch):
+    def failing_stream(prompt, model=None):
+        yield "Partial answer "
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setattr(app, "stream_ollama", failing_stream)
+    events = stream("how do i pay my bill")
+    assert [kind for kind, _ in events] == ["token", "error"]
+    assert "model crashed" in events[-1][1]["error"]
+
+
+def test_client_disconnect_is_counted(stub):
+    def count(status):
+        return app.tracing.REQUESTS._values.get(("chat_stream", status), 0)
+
+    before = count("499")
+    res = app.app.test_client().post("/chat/stream", json={"message": "what are the fibre packages"},
+                                     buffered=False)
+    body = iter(res.response)
+    assert next(body).startswith(b"event: token")
+    res.close()   # the client goes away after the first token
+    assert count("499") == before + 1
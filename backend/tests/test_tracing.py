@@ -0,0 +1,33 @@
+"""Prometheus text output and the load test's reading of it."""
+import os
+
+from loadtest import stage_averages
+from tracing import Registry
+
+
+def test_every_series_carries_the_pid():
+    registry = Registry()
+    registry.counter("t_requests_total", "Requests.", ["endpoint"]).inc("chat")
+    registry.histogram("t_stage_seconds", "Stages.", ["stage"], buckets=(1,)).observe(0.5, "search")
+    registry.gauge("t_pages", "Pages.", lambda: 3)
+    pid = f'pid="{os.getpid()}"'
+    series = [line for line in registry.render().splitlines() if not line.startswith("#")]
+    assert series == [
+        f't_requests_total{{endpoint="chat",{pid}}} 1',
+        f't_stage_seconds_bucket{{stage="search",{pid},le="1"}} 1',
+        f't_stage_seconds_bucket{{stage="search",{pid},le="+Inf"}} 1',
+        f't_stage_seconds_sum{{stage="search",{pid}}} 0.5',
+        f't_stage_seconds_count{{stage="search",{pid}}} 1',
+        f't_pages{{{pid}}} 3',
+    ]
+
+
+def test_stage_averages_sum_over_workers():
+    text = "\n".join([
+        'slt_stage_duration_seconds_sum{stage="retrieval",pid="1"} 0.25',
+        'slt_stage_duration_seconds_count{stage="retrieval",pid="1"} 5',
+        'slt_stage_duration_seconds_sum{stage="retrieval",pid="2"} 0.35',
+        'slt_stage_duration_seconds_count{stage="retrieval",pid="2"} 7',
+        'slt_stage_duration_seconds_bucket{stage="retrieval",pid="2",le="1"} 7',
+    ])
+    assert stage_averages(text) == {"retrieval": 50.0}
@@ -0,0 +1,203 @@
+"""Per-request timing spans, aggregated into Prometheus-format metrics.
+
+Code wraps a stage in `with span("retrieval"):`. Every span feeds the
+slt_stage_duration_seconds histogram, and is also attached to the current
+request's Trace so it can be returned in a Server-Timing debug header.
+
+Metrics live in the memory of one process. Under gunicorn each worker
+keeps its own counts and a scrape of /metrics reaches whichever worker
+takes the request, so every series carries a pid label: sum over pid in
+the query (e.g. `sum without (pid) (rate(slt_requests_total[5m]))`), and
+expect a worker's series to restart from zero when it is replaced.
+"""
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (100, 200, 300, 500, 700, 1000, 1500, 2000, 4000)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self, extra=()):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels, extra)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}   # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self, extra=()):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        extra = tuple(extra)
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    le = extra + (("le", _number(bound)),)
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {count}")
+                inf = extra + (("le", "+Inf"),)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, inf)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels, extra)} {series[-2]!r}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels, extra)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """A value read from a callback at scrape time, e.g. a queue depth."""
+
+    def __init__(self, name, help, read, kind="gauge"):
+        self.name, self.help, self.read, self.kind = name, help, read, kind
+
+    def render(self, extra=()):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}",
+                f"{self.name}{_labels((), (), extra)} {_number(self.read())}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, read, kind="gauge"):
+        return self._add(Gauge(name, help, read, kind))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        # Read the pid at scrape time; gunicorn forks workers after import
+        extra = (("pid", os.getpid()),)
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render(extra))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram(
+    "slt_stage_duration_seconds", "Time spent in each stage of a chat request.", ["stage"])
+REQUEST_SECONDS = REGISTRY.histogram(
+    "slt_request_duration_seconds", "End-to-end request latency.", ["endpoint"])
+REQUESTS = REGISTRY.counter(
+    "slt_requests_total", "Requests served, by endpoint and HTTP status.", ["endpoint", "status"])
+
+
+# -------------------------------
+# ⏱️ Request Traces
+# -------------------------------
+
+_current = contextvars.ContextVar("slt_trace", default=None)
+
+
+class Trace:
+    """Spans recorded while serving one request."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.spans = []     # [(stage, seconds), ...] in completion order
+        self.finished = False
+
+    def add(self, stage, seconds):
+        self.spans.append((stage, seconds))
+
+    def activate(self):
+        # Streamed responses run after the view returns; the generator
+        # re-activates its trace so spans land on the right request
+        _current.set(self)
+        return self
+
+    def finish(self, status):
+        if self.finished:
+            return
+        self.finished = True
+        REQUEST_SECONDS.observe(time.perf_counter() - self.start, self.endpoint)
+        REQUESTS.inc(self.endpoint, str(status))
+
+    def timings(self):
+        """{stage: milliseconds}, repeated stages summed, plus the total so far."""
+        totals = {}
+        for stage, seconds in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        totals["total"] = time.perf_counter() - self.start
+        return {stage: round(seconds * 1000, 2) for stage, seconds in totals.items()}
+
+    def server_timing(self):
+        # Server-Timing shows up in the browser's network panel
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.timings().items())
+
+
+def start_trace(endpoint):
+    return Trace(endpoint).activate()
+
+
+def current_trace():
+    return _current.get()
+
+
+def record(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
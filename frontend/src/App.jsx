@@ -14,6 +14,7 @@ const SLTChatbot = () => {
   const [inputMessage, setInputMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const messagesEndRef = useRef(null);
+  const sessionIdRef = useRef(localStorage.getItem('sltSessionId'));
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -37,42 +38,70 @@ const SLTChatbot = () => {
     setInputMessage('');
     setIsLoading(true);
 
+    const botId = messages.length + 2;
+    let started = false;
+
+    const appendBotText = (text) => {
+      if (!started) {
+        started = true;
+        setIsLoading(false);
+        setMessages(prev => [...prev, { id: botId, text, sender: 'bot', timestamp: new Date() }]);
+      } else {
+        setMessages(prev => prev.map(m => (m.id === botId ? { ...m, text: m.text + text } : m)));
+      }
+    };
+
     try {
-      const response = await fetch('http://localhost:5000/chat', {
+      const response = await fetch('http://localhost:5000/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...(sessionIdRef.current ? { 'X-Session-ID': sessionIdRef.current } : {}),
         },
         body: JSON.stringify({ message: inputMessage }),
       });
 
-      const data = await response.json();
-
-      if (data.reply) {
-        const botMessage = {
-          id: messages.length + 2,
-          text: data.reply,
-          sender: 'bot',
-          timestamp: new Date()
-        };
-        setMessages(prev => [...prev, botMessage]);
-      } else if (data.error) {
-        const errorMessage = {
-          id: messages.length + 2,
-          text: `❌ Error: ${data.error}`,
-          sender: 'bot',
-          timestamp: new Date()
-        };
-        setMessages(prev => [...prev, errorMessage]);
+      const sessionId = response.headers.get('X-Session-ID');
+      if (sessionId) {
+        sessionIdRef.current = sessionId;
+        localStorage.setItem('sltSessionId', sessionId);
+      }
+
+      if (!response.ok) {
+        const data = await response.json();
+        appendBotText(`❌ Error: ${data.error}`);
+        return;
+      }
+
+      // Parse server-sent events ("event: ...\ndata: ...\n\n") as they arrive
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const raw of events) {
+          let event = 'message';
+          let data = '';
+          for (const line of raw.split('\n')) {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          }
+          const payload = data ? JSON.parse(data) : {};
+          if (event === 'token') {
+            appendBotText(payload.text);
+          } else if (event === 'error') {
+            appendBotText(`${started ? '\n\n' : ''}❌ Error: ${payload.error}`);
+          }
+        }
       }
     } catch (error) {
-      const errorMessage = {
-        id: messages.length + 2,
-        text: `❌ Connection error: ${error.message}. Please make sure the backend server is running on port 5000.`,
-        sender: 'bot',
-        timestamp: new Date()
-      };
-      setMessages(prev => [...prev, errorMessage]);
+      appendBotText(`${started ? '\n\n' : ''}❌ Connection error: ${error.message}. Please make sure the backend server is running on port 5000.`);
     } finally {
       setIsLoading(false);
     }